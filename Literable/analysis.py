@@ -1,61 +1,28 @@
 import streamlit as st
-import requests
 from database_manager import db
+from grading import (attach_grading_contexts, estimate_grading, grade_answers, grade_passage, parse_metrics,
+                     run_grading_job)
+from llm_client import UsageTally
+from token_budget import RunEstimate
+from grading_cache import GradingCache
+from answer_matching import AnswerMatcher
+from prompt_registry import CATEGORY_PROMPT_MAP, prompt_version, prompts
+import config
 from typing import Optional, Dict, Any
 import pandas as pd
 from components import generate_pdf_report, format_feedback_report
 
 
-# GPT-4 API 설정
-# GPT-4o API 설정
-FN_CALL_KEY = "5acf6c1d1aed44eaa670dd059c8c84ce"
-FN_CALL_ENDPOINT = "https://apscus-prd-aabc2-openai.openai.azure.com/openai/deployments/gpt-4o/chat/completions?api-version=2024-02-15-preview"
-
-headers_fn_call = {
-    "Content-Type": "application/json",
-    "api-key": FN_CALL_KEY
-}
-
-# 파일 상단에 추가
-CATEGORY_PROMPT_MAP = {
-    '사실적 독해': 'factual',
-    '추론적 독해': 'inferential',
-    '비판적 독해': 'critical',
-    '창의적 독해': 'creative',
-    '': 'default'
-}
-
-def call_llm(system_prompt: str, user_prompt: str) -> Optional[str]:
-    """AI 모델 호출 함수"""
-    payload = {
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "max_tokens": 1500
-    }
-    try:
-        response = requests.post(FN_CALL_ENDPOINT, headers=headers_fn_call, json=payload, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result['choices'][0]['message']['content']
-    except requests.exceptions.RequestException as e:
-        st.error(f"LLM 호출 실패: {e}")
-        return None
+# Streamlit 재실행 사이에도 유지되는 채점 결과 캐시
+grading_cache = GradingCache(db)
 
 
 def load_prompt(category: str) -> Optional[str]:
-    """카테고리별 프롬프트 파일 로드 함수"""
+    """카테고리별 프롬프트 (레지스트리 메모리에서 제공, 파일이 없으면 default)"""
     try:
-        prompt_type = CATEGORY_PROMPT_MAP.get(category, 'default')
-        prompt_filename = f"Literable/prompts/{prompt_type}.txt"
-        #prompt_filename = "Literable/prompt.txt"
-        st.write(f"📁 프롬프트 파일 로드 시도: {prompt_filename}")  # 로딩 시도 로그
-
-        with open(prompt_filename, 'r', encoding='utf-8') as file:
-            return file.read()
-    except FileNotFoundError:
-        st.error(f"프롬프트 파일을 찾을 수 없습니다: {prompt_filename}")
+        return prompts.get(category).text
+    except FileNotFoundError as e:
+        st.error(f"프롬프트 파일을 찾을 수 없습니다: {e.filename}")
         return None
     except Exception as e:
         st.error(f"프롬프트 파일 읽기 오류: {str(e)}")
@@ -72,7 +39,7 @@ def analyze_feedback():
     with col1:
         search_student = st.text_input("학생 이름/학번 검색", key="feedback_student_search")
 
-    students = db.fetch_students(search_student)
+    students = db.fetch_student_options(search_student)
     if not students:
         st.warning("검색된 학생이 없습니다.")
         return
@@ -91,7 +58,7 @@ def analyze_feedback():
     with col1:
         search_passage = st.text_input("지문 제목 검색", key="feedback_passage_search")
 
-    passages = db.fetch_passages(search_passage)
+    passages = db.fetch_passage_titles(search_passage, title_only=True)
     if not passages:
         st.warning("검색된 지문이 없습니다.")
         return
@@ -109,6 +76,11 @@ def analyze_feedback():
         questions = db.fetch_questions(selected_passage[0])
         student_answers = db.fetch_student_answers(selected_student[0], selected_passage[0])
         student_answers_dict = {ans[2]: ans for ans in student_answers}  # question_id를 키로 사용
+        passage = db.fetch_passage(selected_passage[0])
+        passage_text = passage[2] if passage else ''
+        # 문항별 압축 채점 컨텍스트 (문제 저장 시 미리 계산됨, 없거나 원문이 바뀌었으면 여기서 계산)
+        grading_contexts = db.refresh_grading_contexts(passage_id=selected_passage[0]) \
+            if config.GRADING_CONTEXT else {}
 
         if not any(q[0] in student_answers_dict for q in questions):
             st.warning("저장된 답안이 없습니다. 답안 관리 탭에서 먼저 답안을 입력해주세요.")
@@ -117,10 +89,27 @@ def analyze_feedback():
         # 답안 표시 및 분석 준비
         answers_to_analyze = {}
         questions_order = []
+        # 체크된 문제는 LLM 대신 다른 학생의 유사 답안 채점 결과를 사용
+        reused_results = {}
+        matcher = AnswerMatcher(db) if config.FUZZY_MATCH_MODE != 'off' else None
+        # 스트리밍 채점 중 문제별 점수/첨삭을 바로 보여줄 자리
+        live_placeholders = {}
 
         for i, question in enumerate(questions, 1):
             if question[0] in student_answers_dict:  # 답안이 있는 경우만 처리
                 answer = student_answers_dict[question[0]]
+                answers_to_analyze[i] = {
+                    'question_id': question[0],
+                    'student_id': selected_student[0],
+                    'question_text': question[2],
+                    'model_answer': question[3],
+                    'student_answer': answer[3],
+                    'category': question[4],  # 카테고리 추가
+                    'passage_text': passage_text,
+                    'grading_context': grading_contexts.get(question[0])
+                }
+                questions_order.append(i)
+
                 with st.expander(f"{question[2]}", expanded=True):
                     st.write("**모범답안:**")
                     st.info(question[3])
@@ -132,78 +121,108 @@ def analyze_feedback():
                         st.write("**현재 점수:**", f"{answer[4]}점")
                         st.write("**피드백:**", answer[5] if answer[5] else "")
 
-                answers_to_analyze[i] = {
-                    'question_id': question[0],
-                    'question_text': question[2],
-                    'model_answer': question[3],
-                    'student_answer': answer[3],
-                    'category': question[4]  # 카테고리 추가
-                }
-                questions_order.append(i)
+                    live_placeholders[question[0]] = st.empty()
+
+                    match = matcher.find(answers_to_analyze[i]) if matcher else None
+                    if match:
+                        st.caption(f"🔁 유사도 {match['similarity']:.0f}%의 다른 학생 답안이 이미 채점되었습니다: "
+                                   f"{match['score']}점 - {match['feedback']}")
+                        if st.checkbox("이 채점 결과 사용", value=config.FUZZY_MATCH_MODE == 'auto',
+                                       key=f"reuse_match_{question[0]}"):
+                            reused_results[i] = {
+                                'question_id': question[0],
+                                'score': match['score'],
+                                'feedback': match['feedback'],
+                                'source': 'match',
+                                'similarity': match['similarity']
+                            }
 
         if answers_to_analyze:
             if 'analysis_started' not in st.session_state:
                 st.session_state.analysis_started = False
 
+            grade_at_once = st.checkbox("지문 전체를 요청 한 번으로 채점", value=config.LLM_GRADE_PASSAGE_AT_ONCE,
+                                        key="feedback_grade_at_once",
+                                        help="빠지거나 형식이 잘못된 문항은 문항별로 다시 채점합니다.")
+            stream = not grade_at_once and st.checkbox("채점 결과를 받는 대로 표시 (스트리밍)", value=config.LLM_STREAM,
+                                                       key="feedback_stream")
+            use_cache = st.checkbox("이전 채점 결과 재사용 (같은 프롬프트·문제·답안)", value=True, key="feedback_use_cache",
+                                    help="끄면 저장된 결과를 무시하고 모든 문항을 다시 채점합니다.")
+            try:
+                show_estimate(estimate_grading(
+                    [(prompts.get(answers_to_analyze[q_num]['category']).text, answers_to_analyze[q_num])
+                     for q_num in questions_order if q_num not in reused_results],
+                    config.LLM_MAX_CONCURRENCY, grade_at_once
+                ))
+            except OSError:
+                pass  # 프롬프트 파일 오류는 분석 시작 시 안내
+
             # 분석 시작 버튼
             if st.button("📝 AI 첨삭 분석 시작", type="primary") or st.session_state.analysis_started:
                 if not st.session_state.analysis_started:
                     st.session_state.analysis_started = True
 
                     with st.spinner("AI가 답안을 분석중입니다..."):
-                        analysis_results = []
                         progress_bar = st.progress(0)
+                        progress_text = st.empty()
 
-                        for i, q_num in enumerate(questions_order):
-                            try:
-                                data = answers_to_analyze[q_num]
-                                progress_text = st.empty()
-                                progress_text.text(f"분석 진행중... ({i + 1}/{len(questions_order)})")
-                                progress_bar.progress((i + 1) / len(questions_order))
-
-                                # 카테고리별 프롬프트 로드
-                                category = data.get('category', '')  # 카테고리가 없을 경우 빈 문자열
+                        # 카테고리별 프롬프트 로드 (작업 스레드에서는 st 를 쓸 수 없으므로 미리 로드)
+                        system_prompts = {}
+                        tasks = []
+                        for q_num in questions_order:
+                            if q_num in reused_results:
+                                continue
+                            data = answers_to_analyze[q_num]
+                            category = data.get('category', '')  # 카테고리가 없을 경우 빈 문자열
+                            if category not in system_prompts:
                                 system_prompt = load_prompt(category)
-
                                 if system_prompt is None:
                                     st.warning(f"카테고리 '{category}'에 대한 프롬프트를 찾을 수 없어 기본 프롬프트를 사용합니다.")
                                     system_prompt = load_prompt('')  # 빈 문자열을 전달하여 default.txt 사용
-                                    if system_prompt is None:
-                                        continue
-
-                                user_prompt = f"""
-                                문제: {data['question_text']}
-                                모범답안: {data['model_answer']}
-                                학생답안: {data['student_answer']}
-                                """
-
-                                try:
-                                    result = call_llm(system_prompt, user_prompt)
-                                    if result:
-                                        score_text = result.split('점수:')[1].split('\n')[0]
-                                        score = int(score_text.replace('점', '').strip())
-                                        feedback = result.split('첨삭:')[1].strip()
-
-                                        analysis_results.append({
-                                            'question_id': data['question_id'],
-                                            'score': score,
-                                            'feedback': feedback
-                                        })
-                                except Exception as e:
-                                    st.error(f"결과 파싱 중 오류가 발생했습니다: {str(e)}")
-                                    continue
-
-                            except Exception as e:
-                                st.error(f"문제 분석 중 오류가 발생했습니다: {str(e)}")
-                                continue
+                                system_prompts[category] = system_prompt
+                            if system_prompts[category] is not None:
+                                tasks.append((system_prompts[category], data))
+
+                        def update_progress(done: int, total: int) -> None:
+                            progress_bar.progress(done / total)
+                            progress_text.text(f"분석 진행중... ({done}/{total})")
+
+                        def show_partial(data: Dict[str, Any], score: Optional[int], feedback: str) -> None:
+                            score_text = f"{score}점" if score is not None else "채점 중..."
+                            live_placeholders[data['question_id']].warning(
+                                f"**AI 점수:** {score_text}\n\n{feedback}▌")
+
+                        # 문제별 채점 요청을 동시에 보내고 완료되는 대로 진행률 갱신
+                        usage = UsageTally()
+                        if grade_at_once:
+                            analysis_results, failures = grade_passage(tasks, on_progress=update_progress,
+                                                                       cache=grading_cache if use_cache else None,
+                                                                       usage=usage)
+                        else:
+                            analysis_results, failures = grade_answers(tasks, on_progress=update_progress,
+                                                                       cache=grading_cache if use_cache else None,
+                                                                       on_update=show_partial if stream else None,
+                                                                       usage=usage)
+                        if reused_results:
+                            order = {answers_to_analyze[q_num]['question_id']: q_num for q_num in questions_order}
+                            analysis_results = sorted(analysis_results + list(reused_results.values()),
+                                                      key=lambda result: order[result['question_id']])
+                        for data, error in failures:
+                            st.error(f"문제 분석 중 오류가 발생했습니다 ({data['question_text']}): {error}")
 
                         progress_text.empty()
                         progress_bar.empty()
+                        for placeholder in live_placeholders.values():
+                            placeholder.empty()
 
                         if analysis_results:
                             st.session_state['analysis_results'] = analysis_results
                             st.session_state['selected_student'] = selected_student
                             st.success("분석이 완료되었습니다!")
+                            reused = sum(result['source'] != 'llm' for result in analysis_results)
+                            if reused:
+                                st.caption(f"♻️ {reused}개 문항은 이전 채점 결과를 재사용했습니다.")
+                            show_usage(usage)
 
                 # 분석 결과 표시
                 if 'analysis_results' in st.session_state:
@@ -225,41 +244,34 @@ def analyze_feedback():
                         st.session_state.saving_in_progress = True
 
                     if st.session_state.saving_in_progress:
-                        progress_placeholder = st.empty()
                         status_placeholder = st.empty()
-                        save_success = True
+                        status_placeholder.text(f"저장 중... ({len(st.session_state.analysis_results)}개 답안)")
 
                         try:
-                            for idx, result in enumerate(st.session_state.analysis_results):
-                                progress_placeholder.progress((idx + 1) / len(st.session_state.analysis_results))
-                                status_placeholder.text(f"저장 중... ({idx + 1}/{len(st.session_state.analysis_results)})")
-
-                                current_question = next(
-                                    (ans['student_answer'] for ans in answers_to_analyze.values()
-                                     if ans['question_id'] == result['question_id']),
-                                    None
-                                )
-
-                                if current_question is None:
-                                    save_success = False
-                                    st.error(f"답안을 찾을 수 없음 - 질문 ID: {result['question_id']}")
-                                    break
-
-                                success = db.save_student_answer(
-                                    student_id=st.session_state.selected_student[0],
-                                    question_id=result['question_id'],
-                                    answer=current_question,
-                                    score=result['score'],
-                                    feedback=result['feedback']
-                                )
-
-                                if not success:
-                                    save_success = False
-                                    st.error(f"답안 저장 실패 - 질문 ID: {result['question_id']}")
-                                    break
+                            student_answer_by_question = {
+                                ans['question_id']: ans['student_answer'] for ans in answers_to_analyze.values()
+                            }
+                            missing = [result['question_id'] for result in st.session_state.analysis_results
+                                       if result['question_id'] not in student_answer_by_question]
+
+                            if missing:
+                                save_success = False
+                                st.error(f"답안을 찾을 수 없음 - 질문 ID: {', '.join(map(str, missing))}")
+                            else:
+                                # 한 트랜잭션으로 모든 결과 저장
+                                save_success = db.save_student_answers_bulk([
+                                    (
+                                        st.session_state.selected_student[0],
+                                        result['question_id'],
+                                        student_answer_by_question[result['question_id']],
+                                        result['score'],
+                                        result['feedback'],
+                                        result.get('prompt_version')
+                                    )
+                                    for result in st.session_state.analysis_results
+                                ])
 
                             # 저장 완료 후 UI 정리
-                            progress_placeholder.empty()
                             status_placeholder.empty()
 
                             if save_success:
@@ -267,15 +279,194 @@ def analyze_feedback():
                                 st.session_state.saving_in_progress = False
                                 st.session_state.analysis_started = False
                             else:
-                                st.error("일부 답안 저장에 실패했습니다. 다시 시도해주세요.")
+                                st.error("답안 저장에 실패했습니다. 다시 시도해주세요.")
                                 st.session_state.saving_in_progress = False
 
                         except Exception as e:
-                            progress_placeholder.empty()
                             status_placeholder.empty()
                             st.error(f"저장 중 오류 발생: {str(e)}")
                             st.session_state.saving_in_progress = False
 
+GRADING_SCOPE_LABELS = {
+    'ungraded': "미채점 답안만",
+    'school': "특정 학교 학생 전체",
+    'all': "모든 답안 (재채점)",
+}
+
+
+def show_usage(usage: UsageTally) -> None:
+    """이번 실행의 토큰 사용량과 프롬프트 캐시 적중 비율 표시"""
+    if not usage.requests:
+        return
+    text = (f"🔢 LLM 요청 {usage.requests}건 · 입력 {usage.prompt_tokens:,} 토큰 "
+            f"(캐시 {usage.cached_tokens:,}, {usage.cached_ratio:.0%}) · 출력 {usage.completion_tokens:,} 토큰 "
+            f"· 입력 추정 {usage.estimated_prompt_tokens:,} 토큰")
+    if usage.unreported:
+        text += f" · 사용량 미보고 {usage.unreported}건(스트리밍)"
+    st.caption(text)
+
+
+def show_estimate(estimate: RunEstimate) -> None:
+    """채점 실행 전 예상 토큰/비용/소요 시간 표시"""
+    if not estimate.requests:
+        return
+    minutes, seconds = divmod(round(estimate.seconds), 60)
+    st.caption(f"📐 예상: 요청 {estimate.requests}건 · 입력 약 {estimate.input_tokens:,} 토큰 · "
+               f"출력 약 {estimate.output_tokens:,} 토큰 · 비용 약 ${estimate.cost:.3f} · "
+               f"소요 약 {minutes}분 {seconds}초 (재사용 결과 반영 전 기준)")
+
+
+def load_batch_prompts() -> Optional[Dict[str, str]]:
+    """카테고리별 시스템 프롬프트 (작업 스레드에서는 st 를 쓸 수 없으므로 미리 로드) - 기본 프롬프트가 없으면 None"""
+    system_prompts = {}
+    for category in CATEGORY_PROMPT_MAP:
+        system_prompt = load_prompt(category)
+        if system_prompt is not None:
+            system_prompts[category] = system_prompt
+    if '' not in system_prompts:
+        st.error("기본 프롬프트를 불러오지 못해 채점을 시작할 수 없습니다.")
+        return None
+    return system_prompts
+
+
+def batch_grade_feedback():
+    """지문 하나의 여러 학생 답안을 한 번에 채점하는 일괄 첨삭 UI"""
+    st.subheader("일괄 첨삭")
+
+    col1, col2 = st.columns([2, 2])
+    with col1:
+        search_passage = st.text_input("지문 제목 검색", key="batch_passage_search")
+    passages = db.fetch_passage_titles(search_passage, title_only=True)
+    if not passages:
+        st.warning("검색된 지문이 없습니다.")
+        return
+    with col2:
+        selected_passage = st.selectbox("지문 선택", passages, format_func=lambda x: x[1],
+                                        key="batch_passage_select")
+
+    scope = st.radio("채점 대상", list(GRADING_SCOPE_LABELS), format_func=GRADING_SCOPE_LABELS.get,
+                     horizontal=True, key="batch_scope")
+    school = None
+    if scope == 'school':
+        schools = db.fetch_schools()
+        if not schools:
+            st.warning("등록된 학교가 없습니다.")
+            return
+        school = st.selectbox("학교 선택", schools, key="batch_school")
+
+    if st.button("📋 일괄 채점 작업 만들기", key="batch_create"):
+        job_id, item_count = db.create_grading_job(selected_passage[0], scope, school)
+        if item_count:
+            st.session_state.batch_job_id = job_id
+            st.success(f"작업 #{job_id}: 답안 {item_count}개를 채점 대기열에 추가했습니다.")
+        else:
+            st.info("채점할 답안이 없습니다.")
+
+    jobs = db.fetch_grading_jobs(selected_passage[0])
+    if not jobs:
+        return
+
+    st.write("### 채점 작업")
+    job_ids = [job[0] for job in jobs]
+    default_index = job_ids.index(st.session_state.batch_job_id) \
+        if st.session_state.get('batch_job_id') in job_ids else 0
+    job = st.selectbox(
+        "작업 선택",
+        jobs,
+        index=default_index,
+        format_func=lambda x: (f"#{x[0]} {GRADING_SCOPE_LABELS.get(x[3], x[3])}"
+                               f"{f' ({x[4]})' if x[4] else ''} · {x[5]} · 완료 {x[7]}/{x[6]}"
+                               f"{f' · 실패 {x[8]}' if x[8] else ''}"),
+        key="batch_job_select"
+    )
+    job_id, total = job[0], job[6]
+
+    progress = db.get_grading_job_progress(job_id)
+    cols = st.columns(4)
+    cols[0].metric("대기", progress['pending'] + progress['running'])
+    cols[1].metric("완료", progress['done'])
+    cols[2].metric("실패", progress['failed'],
+                   help=f"재시도 횟수를 모두 써서 이어하기로 다시 채점되지 않는 답안 {progress['exhausted']}개 포함")
+    cols[3].metric("전체", total)
+
+    remaining = total - progress['done']
+    use_cache = st.checkbox("이전 채점 결과 재사용 (같은 프롬프트·문제·답안)", value=True, key="batch_use_cache")
+    use_matches = config.FUZZY_MATCH_MODE != 'off' and st.checkbox(
+        f"유사 답안의 채점 결과 자동 적용 ({', '.join(config.FUZZY_MATCH_CATEGORIES)}, "
+        f"유사도 {config.FUZZY_MATCH_THRESHOLD:.0f}% 이상)",
+        value=config.FUZZY_MATCH_MODE == 'auto', key="batch_use_matches"
+    )
+    system_prompts = load_batch_prompts() if remaining else None
+    if system_prompts:
+        # 예상치는 작업 항목 조회 + 컨텍스트 갱신(DB 쓰기) + 항목별 프롬프트 계산이라 진행 상황이 바뀔 때만 다시 계산
+        estimate_key = (job_id, tuple(sorted(progress.items())),
+                        tuple(sorted((category, prompt_version(prompt)) for category, prompt in system_prompts.items())))
+        if st.session_state.get('batch_estimate_key') != estimate_key:
+            items = db.fetch_grading_job_items(job_id, config.LLM_BATCH_MAX_ATTEMPTS)
+            attach_grading_contexts(db, items)
+            st.session_state.batch_estimate = estimate_grading(
+                [(system_prompts.get(item['category'], system_prompts['']), item) for item in items],
+                config.LLM_BATCH_CONCURRENCY
+            )
+            st.session_state.batch_estimate_key = estimate_key
+        show_estimate(st.session_state.batch_estimate)
+
+    if system_prompts and st.button("▶️ 채점 시작 / 이어하기", type="primary", key="batch_run"):
+        progress_bar = st.progress(0)
+        progress_text = st.empty()
+        counts = {'done': progress['done'], 'failed': 0}
+
+        def update_progress(item: Dict[str, Any], error: Optional[str]) -> None:
+            counts['failed' if error else 'done'] += 1
+            progress_bar.progress(min(counts['done'] / total, 1.0))
+            failed = f" · 실패 {counts['failed']}" if counts['failed'] else ""
+            progress_text.text(f"채점 진행중... 완료 {counts['done']}/{total}{failed}")
+
+        usage = UsageTally()
+        with st.spinner("AI가 답안을 채점중입니다..."):
+            progress = run_grading_job(db, job_id, system_prompts, on_progress=update_progress,
+                                       cache=grading_cache if use_cache else None,
+                                       matcher=AnswerMatcher(db) if use_matches else None,
+                                       usage=usage)
+
+        progress_text.empty()
+        progress_bar.empty()
+        if progress['deferred']:
+            st.warning(f"LLM 엔드포인트를 사용할 수 없어 채점을 멈췄습니다. 답안 {progress['deferred']}개를 대기 상태로 "
+                       f"되돌렸으니 잠시 후 '채점 시작 / 이어하기'를 다시 눌러 주세요. (완료 {progress['done']}개)")
+        elif progress['failed']:
+            retryable = progress['failed'] - progress['exhausted']
+            message = f"완료 {progress['done']}개, 실패 {progress['failed']}개"
+            if retryable:
+                message += f" - 다시 실행하면 실패한 답안 {retryable}개를 재시도합니다"
+            if progress['exhausted']:
+                message += (f" - {progress['exhausted']}개는 재시도 횟수({config.LLM_BATCH_MAX_ATTEMPTS}회)를 모두 써서 "
+                            f"아래 '실패한 답안 다시 채점'으로 초기화해야 다시 채점됩니다")
+            st.warning(message + ".")
+        else:
+            st.success(f"답안 {progress['done']}개의 채점이 완료되었습니다!")
+        parsing = parse_metrics.snapshot()
+        if parsing['reasked'] or parsing['legacy']:
+            st.caption(f"🧾 응답 형식: JSON {parsing['json']} · 예전 형식 {parsing['legacy']} · "
+                       f"형식 재요청 {parsing['reasked']} · 파싱 실패 {parsing['failed']}")
+        if use_cache:
+            stats = grading_cache.stats()
+            shared = f" · 진행 중인 같은 채점 공유 {stats['shared']}" if stats['shared'] else ""
+            st.caption(f"♻️ 채점 캐시: 적중 {stats['hits']} · 미스 {stats['misses']}{shared} "
+                       f"(적중률 {stats['hit_rate']:.0%}, 저장 {stats['entries']:,}개)")
+        show_usage(usage)
+
+    failures = db.fetch_grading_job_failures(job_id)
+    if failures:
+        with st.expander(f"실패한 답안 ({len(failures)}개)"):
+            for name, question, attempts, error in failures:
+                st.error(f"{name} - {question} (시도 {attempts}회): {error}")
+            # 재시도 횟수를 모두 쓴 답안은 이어하기로 다시 채점되지 않으므로 횟수를 초기화해 대기열로 되돌린다
+            if st.button("🔄 실패한 답안 다시 채점 (시도 횟수 초기화)", key="batch_reset_failed"):
+                db.reset_failed_grading_job_items(job_id)
+                st.rerun()
+
+
 def show_detailed_analysis():
     """분석 결과 표시 UI 컴포넌트"""
     st.subheader("분석 결과")
@@ -286,8 +477,7 @@ def show_detailed_analysis():
         search_student = st.text_input("학생 이름/학번 검색", key="analysis_student_search")
 
     # 답안이 있는 학생만 조회
-    students = [student for student in db.fetch_students(search_student)
-                if db.fetch_student_answers(student[0], None)]
+    students = db.fetch_students_with_graded_counts(search_student)
 
     if not students:
         st.info("분석된 답안이 있는 학생이 없습니다.")
@@ -297,21 +487,18 @@ def show_detailed_analysis():
         selected_student = st.selectbox(
             "학생 선택",
             students,
-            format_func=lambda x: f"{x[1]} ({x[2]} - {x[3]})"
+            format_func=lambda x: f"{x[1]} ({x[2]} - {x[3]}) · 채점 {x[4]}개"
         )
 
     if selected_student:
         # 학생이 답안을 제출한 지문만 조회
-        passages_with_answers = []
-        for passage in db.fetch_passages():
-            if db.fetch_student_answers(selected_student[0], passage[0]):
-                passages_with_answers.append(passage)
+        passages_with_answers = db.fetch_student_passage_summaries(selected_student[0])
 
         if passages_with_answers:
             selected_passage = st.selectbox(
                 "지문 선택",
                 passages_with_answers,
-                format_func=lambda x: x[1]
+                format_func=lambda x: f"{x[1]} ({x[2]}문항 · 평균 {x[3] or 0:.1f}점)"
             )
 
             if selected_passage:
@@ -0,0 +1,79 @@
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from rapidfuzz import fuzz, process
+import config
+from grading_cache import normalize_answer
+
+# 같은 문제에 이미 채점된 거의 같은 답안을 찾아 그 점수/첨삭을 재사용한다.
+# 문제별 채점 답안은 처음 필요할 때 한 번만 읽고, 이후 채점되는 답안도 추가해
+# 같은 실행 안의 중복 답안도 LLM 호출 없이 처리한다.
+
+# 본인의 이전 채점 결과를 건너뛰기 위해 유사 답안을 몇 개까지 살펴볼지
+_CANDIDATES = 5
+
+
+class AnswerMatcher:
+    """문제별 채점 답안에서 유사 답안 검색 (작업 스레드에서 호출 가능)"""
+
+    def __init__(self, db: Any, threshold: float = config.FUZZY_MATCH_THRESHOLD,
+                 categories: Tuple[str, ...] = config.FUZZY_MATCH_CATEGORIES):
+        self.db = db
+        self.threshold = threshold
+        self.categories = set(categories)
+        # question_id -> 정규화한 답안 -> (점수, 첨삭, 답안을 낸 학생 id)
+        self._graded: Dict[int, Dict[str, Tuple[int, str, Set[int]]]] = {}
+        self._lock = threading.Lock()
+
+    def applies_to(self, data: Dict[str, Any]) -> bool:
+        return (data.get('category') or '') in self.categories
+
+    def _answers(self, question_id: int) -> Dict[str, Tuple[int, str, Set[int]]]:
+        with self._lock:
+            answers = self._graded.get(question_id)
+        if answers is None:
+            answers = {}
+            for student_id, answer, score, feedback in self.db.fetch_graded_answers(question_id):
+                text = normalize_answer(answer)
+                if text in answers:
+                    answers[text][2].add(student_id)
+                else:
+                    answers[text] = (score, feedback, {student_id})
+            with self._lock:
+                answers = self._graded.setdefault(question_id, answers)
+        return answers
+
+    def find(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """다른 학생의 유사 답안 채점 결과 {'score', 'feedback', 'similarity'} (없으면 None)"""
+        if not self.applies_to(data):
+            return None
+        text = normalize_answer(data['student_answer'])
+        if not text:
+            return None
+        answers = self._answers(data['question_id'])
+        student_id = data.get('student_id')
+
+        with self._lock:
+            exact = answers.get(text)
+            if exact and exact[2] - {student_id}:
+                return {'score': exact[0], 'feedback': exact[1], 'similarity': 100.0}
+            matches: List[Tuple[str, float, str]] = process.extract(
+                text, list(answers), scorer=fuzz.ratio, processor=None,
+                score_cutoff=self.threshold, limit=_CANDIDATES
+            )
+            for choice, similarity, _ in matches:
+                score, feedback, students = answers[choice]
+                if students - {student_id}:
+                    return {'score': score, 'feedback': feedback, 'similarity': similarity}
+        return None
+
+    def add(self, data: Dict[str, Any], score: int, feedback: str) -> None:
+        """새로 채점한 답안을 이후 검색 대상에 추가"""
+        if not self.applies_to(data):
+            return
+        text = normalize_answer(data['student_answer'])
+        answers = self._answers(data['question_id'])
+        with self._lock:
+            if text in answers:
+                answers[text][2].add(data.get('student_id'))
+            else:
+                answers[text] = (score, feedback, {data.get('student_id')})
@@ -0,0 +1,383 @@
+"""DatabaseManager 성능 벤치마크
+
+합성 데이터(synthetic_data.py)로 만든 DB 에서 DatabaseManager 의 모든 공개 메서드를 측정하고
+결과(ops/sec, p50/p95 지연시간, 전체 실행의 peak RSS)를 JSON 으로 저장한다. 기준 결과와 비교해 느려진 항목을 표시한다.
+--baseline 을 주지 않으면 저장소의 benchmark_baseline.json 을 쓰되, 그 결과를 측정한 환경(environment:
+플랫폼/Python/SQLite)이 지금과 같을 때만 비교한다. 다른 장비에서는 --output 으로 만든 기준을 직접 지정한다.
+
+    python Literable/benchmark.py --scales tiny medium --output bench.json
+    python Literable/benchmark.py --scales tiny --baseline bench.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from synthetic_data import PRESETS, generate
+from database_manager import DatabaseManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # setup(i) 의 반환값을 받아 측정 대상 작업을 실행
+    run: Callable[[Any], Any]
+    # 측정에서 제외되는 준비 작업
+    setup: Optional[Callable[[int], Any]] = None
+    iterations: int = 200
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 는 바이트, Linux 는 KiB 단위
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_benchmark(bench: Benchmark, iterations: Optional[int] = None) -> Dict[str, Any]:
+    iterations = iterations or bench.iterations
+    # 캐시가 데워지기 전의 첫 실행은 측정에서 제외
+    for i in range(max(1, iterations // 10)):
+        bench.run(bench.setup(-1 - i) if bench.setup else None)
+
+    latencies = []
+    for i in range(iterations):
+        args = bench.setup(i) if bench.setup else None
+        started = time.perf_counter()
+        bench.run(args)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'ops_per_sec': iterations / total if total else float('inf'),
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+    }
+
+
+def build_benchmarks(db: DatabaseManager, seed: int) -> List[Benchmark]:
+    """Benchmarks covering every public DatabaseManager method (connection() is exercised by all of them)"""
+    rnd = random.Random(seed)
+    with db.connection() as conn:
+        student_ids = [row[0] for row in conn.execute("SELECT id FROM students")]
+        passage_ids = [row[0] for row in conn.execute("SELECT id FROM passages")]
+        question_ids = [row[0] for row in conn.execute("SELECT id FROM questions")]
+        answer_pairs = conn.execute("SELECT student_id, question_id FROM student_answers LIMIT 100000").fetchall()
+        sample_title = conn.execute("SELECT title FROM passages LIMIT 1").fetchone()[0]
+        days = [row[0] for row in conn.execute("SELECT day FROM stats_day ORDER BY day")]
+
+    def student(_: int = 0) -> int:
+        return rnd.choice(student_ids)
+
+    def passage(_: int = 0) -> int:
+        return rnd.choice(passage_ids)
+
+    def new_student(_: int) -> int:
+        db.add_student("bench", "bench school", "B")
+        with db.connection() as conn:
+            return conn.execute("SELECT MAX(id) FROM students").fetchone()[0]
+
+    def new_passage_with_answers(_: int) -> int:
+        # delete_passage 측정용: 문제 4개와 학생 답안이 달린 지문을 만든다
+        passage_id = db.add_passage("bench passage", "벤치마크용 지문 본문입니다. " * 50)
+        for category in ('사실적 독해', '추론적 독해', '비판적 독해', '창의적 독해'):
+            db.add_question(passage_id, "bench question", "bench model answer", category)
+        rows = [(sid, question[0], "bench answer", 3, "bench feedback")
+                for sid in rnd.sample(student_ids, min(20, len(student_ids)))
+                for question in db.fetch_questions(passage_id)]
+        db.save_student_answers_bulk(rows)
+        return passage_id
+
+    def new_question(_: int) -> int:
+        db.add_question(passage(), "bench question", "bench model answer", '사실적 독해')
+        with db.connection() as conn:
+            return conn.execute("SELECT MAX(id) FROM questions").fetchone()[0]
+
+    def existing_answer_id(_: int) -> int:
+        sid, qid = rnd.choice(answer_pairs)
+        db.save_student_answer(sid, qid, "bench answer", 3, "bench feedback")
+        with db.connection() as conn:
+            return conn.execute("SELECT id FROM student_answers WHERE student_id = ? AND question_id = ?",
+                                (sid, qid)).fetchone()[0]
+
+    job_items: List[Dict[str, Any]] = []
+    cache_keys: List[str] = []
+
+    def new_job(_: int = 0) -> int:
+        return db.create_grading_job(passage(), 'all')[0]
+
+    def claimed_item(_: int) -> Dict[str, Any]:
+        # complete/fail 측정용: 작업 하나를 만들어 모든 항목을 임대해 두고 하나씩 꺼낸다
+        if not job_items:
+            job_items.extend(db.claim_grading_job_items(new_job(), 3, "bench"))
+        return job_items.pop()
+
+    def cache_key(i: int) -> str:
+        key = f"bench-{i}"
+        cache_keys.append(key)
+        return key
+
+    def stale_contexts(_: int) -> int:
+        passage_id = passage()
+        with db.connection() as conn:
+            conn.execute("""DELETE FROM grading_contexts
+                            WHERE question_id IN (SELECT id FROM questions WHERE passage_id = ?)""", (passage_id,))
+        return passage_id
+
+    job_id = new_job()
+    context_passage = passage()
+
+    def bulk_rows(_: int) -> List[tuple]:
+        sid = student()
+        return [(sid, qid, "bench answer", rnd.randint(0, 5), "bench feedback")
+                for qid in rnd.sample(question_ids, min(40, len(question_ids)))]
+
+    return [
+        # Students
+        Benchmark("fetch_students", lambda _: db.fetch_students(), iterations=20),
+        Benchmark("fetch_students[search]", lambda _: db.fetch_students("김")),
+        Benchmark("fetch_students_page", lambda after: db.fetch_students_page(after_id=after, limit=20),
+                  setup=lambda _: student()),
+        Benchmark("count_students", lambda _: db.count_students()),
+        Benchmark("fetch_student_options", lambda _: db.fetch_student_options(), iterations=20),
+        Benchmark("fetch_students_with_graded_counts", lambda _: db.fetch_students_with_graded_counts(),
+                  iterations=10),
+        Benchmark("get_student_with_answers", lambda _: db.get_student_with_answers(), iterations=10),
+        Benchmark("add_student", lambda i: db.add_student(f"bench{i}", "bench school", f"B{i}"),
+                  setup=lambda i: i, iterations=100),
+        Benchmark("update_student", lambda sid: db.update_student(sid, "bench", "bench school", "B0"),
+                  setup=student, iterations=100),
+        Benchmark("delete_student", lambda sid: db.delete_student(sid), setup=new_student, iterations=50),
+        # Passages and search
+        Benchmark("fetch_passages", lambda _: db.fetch_passages(), iterations=10),
+        Benchmark("fetch_passages[search]", lambda _: db.fetch_passages(sample_title.split()[0]), iterations=20),
+        Benchmark("fetch_passage_titles", lambda _: db.fetch_passage_titles(), iterations=50),
+        Benchmark("fetch_passage", lambda pid: db.fetch_passage(pid), setup=passage),
+        Benchmark("fetch_passages_page", lambda after: db.fetch_passages_page(after_id=after, limit=20),
+                  setup=lambda _: passage()),
+        Benchmark("count_passages", lambda _: db.count_passages()),
+        Benchmark("search_passages[trigram]", lambda _: db.search_passages("엑스레이"), iterations=50),
+        Benchmark("search_passages[short]", lambda _: db.search_passages("기술"), iterations=10),
+        Benchmark("search_questions", lambda _: db.search_questions("정의는"), iterations=50),
+        Benchmark("add_passage", lambda _: db.add_passage("bench", "벤치마크용 지문 본문입니다. " * 50),
+                  iterations=100),
+        Benchmark("update_passage", lambda pid: db.update_passage(pid, "bench", "수정된 본문입니다. " * 50),
+                  setup=passage, iterations=100),
+        Benchmark("delete_passage", lambda pid: db.delete_passage(pid), setup=new_passage_with_answers,
+                  iterations=30),
+        # Questions
+        Benchmark("fetch_questions", lambda pid: db.fetch_questions(pid), setup=passage),
+        Benchmark("add_question", lambda pid: db.add_question(pid, "bench", "bench", '추론적 독해'),
+                  setup=passage, iterations=100),
+        Benchmark("update_question", lambda qid: db.update_question(qid, "bench", "bench", '비판적 독해'),
+                  setup=lambda _: rnd.choice(question_ids), iterations=100),
+        Benchmark("delete_question", lambda qid: db.delete_question(qid), setup=new_question, iterations=50),
+        # Answers
+        Benchmark("fetch_student_answers", lambda sid: db.fetch_student_answers(sid), setup=student),
+        Benchmark("fetch_student_answers[passage]", lambda args: db.fetch_student_answers(*args),
+                  setup=lambda _: rnd.choice(answer_pairs)[0:1] + (passage(),)),
+        Benchmark("fetch_student_passage_summaries", lambda sid: db.fetch_student_passage_summaries(sid),
+                  setup=student),
+        Benchmark("save_student_answer",
+                  lambda args: db.save_student_answer(*args, "bench answer", 4, "bench feedback"),
+                  setup=lambda _: (student(), rnd.choice(question_ids)), iterations=200),
+        Benchmark("save_student_answers_bulk[40]", lambda rows: db.save_student_answers_bulk(rows),
+                  setup=bulk_rows, iterations=50),
+        Benchmark("delete_student_answer", lambda aid: db.delete_student_answer(aid), setup=existing_answer_id,
+                  iterations=100),
+        Benchmark("fetch_graded_answers", lambda qid: db.fetch_graded_answers(qid),
+                  setup=lambda _: rnd.choice(question_ids)),
+        # Grading contexts
+        Benchmark("refresh_grading_contexts[stale]", lambda pid: db.refresh_grading_contexts(passage_id=pid),
+                  setup=stale_contexts, iterations=50),
+        Benchmark("refresh_grading_contexts[stored]",
+                  lambda _: db.refresh_grading_contexts(passage_id=context_passage)),
+        # Batch grading jobs
+        Benchmark("fetch_schools", lambda _: db.fetch_schools(), iterations=50),
+        Benchmark("create_grading_job[all]", lambda pid: db.create_grading_job(pid, 'all'), setup=passage,
+                  iterations=50),
+        Benchmark("fetch_grading_jobs", lambda pid: db.fetch_grading_jobs(pid), setup=passage),
+        Benchmark("get_grading_job_progress", lambda _: db.get_grading_job_progress(job_id)),
+        Benchmark("fetch_grading_job_items", lambda _: db.fetch_grading_job_items(job_id, 3), iterations=50),
+        Benchmark("claim_grading_job_items[16]", lambda jid: db.claim_grading_job_items(jid, 3, "bench", 16),
+                  setup=new_job, iterations=50),
+        Benchmark("complete_grading_job_item",
+                  lambda item: db.complete_grading_job_item(item['item_id'], item['student_id'],
+                                                            item['question_id'], item['student_answer'], 4,
+                                                            "bench feedback", "bench", "bench"),
+                  setup=claimed_item, iterations=100),
+        Benchmark("fail_grading_job_item", lambda item: db.fail_grading_job_item(item['item_id'], "bench", True,
+                                                                                 "bench"),
+                  setup=claimed_item, iterations=100),
+        Benchmark("release_grading_job_item", lambda item: db.release_grading_job_item(item['item_id'], "bench"),
+                  setup=claimed_item, iterations=100),
+        Benchmark("reset_failed_grading_job_items", lambda _: db.reset_failed_grading_job_items(job_id),
+                  iterations=50),
+        Benchmark("fetch_grading_job_failures", lambda _: db.fetch_grading_job_failures(job_id)),
+        # Grading result cache
+        Benchmark("put_cached_grading", lambda key: db.put_cached_grading(key, 3, "bench feedback", time.time()),
+                  setup=cache_key, iterations=200),
+        Benchmark("get_cached_grading", lambda key: db.get_cached_grading(key, time.time()),
+                  setup=lambda _: rnd.choice(cache_keys)),
+        Benchmark("count_cached_gradings", lambda _: db.count_cached_gradings()),
+        Benchmark("evict_grading_cache", lambda _: db.evict_grading_cache(50000, 0.0), iterations=50),
+        # Statistics
+        Benchmark("get_overall_statistics", lambda _: db.get_overall_statistics()),
+        Benchmark("get_student_statistics", lambda sid: db.get_student_statistics(sid), setup=student),
+        Benchmark("get_passage_statistics", lambda pid: db.get_passage_statistics(pid), setup=passage),
+        Benchmark("get_category_statistics", lambda _: db.get_category_statistics()),
+        Benchmark("get_daily_statistics", lambda _: db.get_daily_statistics(days[0], days[-1])),
+        Benchmark("rebuild_statistics", lambda _: db.rebuild_statistics(), iterations=3),
+        Benchmark("effective_settings", lambda _: db.effective_settings()),
+        Benchmark("init_db", lambda _: db.init_db(), iterations=50),
+    ]
+
+
+def scenario_database(scale_name: str, data_dir: str, seed: int) -> str:
+    """Return a pristine synthetic database for the scale, generating it once per seed"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{scale_name}-seed{seed}.db")
+    if not os.path.exists(path):
+        generate(path, PRESETS[scale_name], seed=seed)
+        # 복사 전에 WAL 내용을 본 파일로 합침
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return path
+
+
+def run_scale(scale_name: str, data_dir: str, seed: int, only: Optional[List[str]],
+              iteration_factor: float) -> Dict[str, Any]:
+    pristine = scenario_database(scale_name, data_dir, seed)
+    # 쓰기 벤치마크가 원본을 바꾸지 않도록 복사본에서 실행
+    working = os.path.join(data_dir, f"{scale_name}-run.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(working + suffix):
+            os.remove(working + suffix)
+    shutil.copyfile(pristine, working)
+
+    db = DatabaseManager(working)
+    results = {}
+    try:
+        for bench in build_benchmarks(db, seed):
+            if only and not any(pattern in bench.name for pattern in only):
+                continue
+            iterations = max(1, round(bench.iterations * iteration_factor))
+            results[bench.name] = run_benchmark(bench, iterations)
+            r = results[bench.name]
+            print(f"  {scale_name:>6} {bench.name:<36} {r['ops_per_sec']:>10.1f} ops/s "
+                  f"p50 {r['p50_ms']:>8.3f} ms  p95 {r['p95_ms']:>8.3f} ms")
+    finally:
+        db.pool.close_all()
+    return {
+        'scale': PRESETS[scale_name]._asdict(),
+        'answers': PRESETS[scale_name].answers,
+        'benchmarks': results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of benchmarks whose p50 latency regressed beyond tolerance"""
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%} on p50):")
+    for scale_name, scale_result in results['scales'].items():
+        base_scale = baseline.get('scales', {}).get(scale_name)
+        if not base_scale:
+            print(f"  {scale_name}: no baseline")
+            continue
+        for name, current in scale_result['benchmarks'].items():
+            base = base_scale['benchmarks'].get(name)
+            if not base:
+                continue
+            ratio = current['p50_ms'] / base['p50_ms'] if base['p50_ms'] else 1.0
+            marker = ""
+            if ratio > 1 + tolerance:
+                marker = "  << REGRESSION"
+                regressions.append(f"{scale_name}/{name}: p50 {base['p50_ms']:.3f} -> {current['p50_ms']:.3f} ms")
+            elif ratio < 1 - tolerance:
+                marker = "  (faster)"
+            print(f"  {scale_name:>6} {name:<36} x{ratio:>6.2f}{marker}")
+    return regressions
+
+
+def load_baseline(path: Optional[str], environment: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """The explicit baseline, or the committed one when it was recorded in the same environment"""
+    if path:
+        with open(path, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get('environment') != environment:
+            print(f"\nnote: baseline {path} was recorded in a different environment {baseline.get('environment')}")
+        return baseline
+    if not os.path.exists(BASELINE_PATH):
+        return None
+    with open(BASELINE_PATH, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get('environment') != environment:
+        # 다른 장비의 시간과 비교하면 의미 없는 회귀/개선이 보고된다
+        print(f"\ncommitted baseline was recorded in {baseline.get('environment')}; "
+              f"skipping comparison (pass --baseline to compare)")
+        return None
+    return baseline
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseManager on synthetic data")
+    parser.add_argument("--scales", nargs="+", choices=sorted(PRESETS), default=["tiny", "medium"],
+                        help="tiny≈10³, medium≈10⁵, large≈10⁶ answers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=".benchmark_data", help="where generated databases are cached")
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--iteration-factor", type=float, default=1.0, help="scale every iteration count")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="compare against a previous JSON result "
+                                           "(default: the committed baseline, if recorded in this environment)")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'seed': args.seed,
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'scales': {},
+    }
+    for scale_name in args.scales:
+        print(f"[{scale_name}] ~{PRESETS[scale_name].answers:,} answers")
+        results['scales'][scale_name] = run_scale(scale_name, args.data_dir, args.seed, args.only,
+                                                  args.iteration_factor)
+    # ru_maxrss 는 프로세스 전체의 최댓값이라 메서드별로 나눌 수 없으므로 실행 전체에 대해 한 번만 기록
+    results['peak_rss_kb'] = _peak_rss_kb()
+    print(f"peak RSS {results['peak_rss_kb'] / 1024:.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+        print(f"\nresults written to {args.output}")
+
+    baseline = load_baseline(args.baseline, results['environment'])
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):\n  " + "\n  ".join(regressions))
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
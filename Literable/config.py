@@ -0,0 +1,78 @@
+import os
+
+# 환경변수로 덮어쓸 수 있는 앱 설정
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return value.strip().lower() in ("1", "true", "yes", "on") if value not in (None, "") else default
+
+
+# Database 설정
+DB_PATH = os.getenv("LITERABLE_DB_PATH", "Literable.db")
+DB_POOL_SIZE = _env_int("LITERABLE_DB_POOL_SIZE", 8)
+# database_manager.PERFORMANCE_PROFILES 중 하나 (balanced, durable, bulk_load, legacy)
+DB_PROFILE = os.getenv("LITERABLE_DB_PROFILE", "balanced")
+
+# UI 설정
+LIST_PAGE_SIZE = _env_int("LITERABLE_LIST_PAGE_SIZE", 20)
+
+# LLM 채점 설정
+LLM_MAX_CONCURRENCY = _env_int("LITERABLE_LLM_MAX_CONCURRENCY", 4)
+# 일괄 채점은 답안 수가 많으므로 더 많은 요청을 동시에 보내고, 실패한 답안은 최대 횟수까지 재시도
+LLM_BATCH_CONCURRENCY = _env_int("LITERABLE_LLM_BATCH_CONCURRENCY", 16)
+LLM_BATCH_MAX_ATTEMPTS = _env_int("LITERABLE_LLM_BATCH_MAX_ATTEMPTS", 3)
+# 일괄 채점 항목 임대 시간 (초) - 이 시간 안에 끝나지 않은 running 항목은 다른 실행이 다시 가져갈 수 있다
+LLM_BATCH_LEASE_SECONDS = _env_int("LITERABLE_LLM_BATCH_LEASE_SECONDS", 300)
+# 한 학생의 지문 답안을 문항별 요청 대신 요청 한 번(JSON 배열 응답)으로 채점할지 기본값
+LLM_GRADE_PASSAGE_AT_ONCE = _env_bool("LITERABLE_LLM_GRADE_PASSAGE_AT_ONCE", False)
+# 문항별 채점 시 응답을 스트리밍으로 받아 점수와 첨삭을 받는 대로 표시할지 기본값
+LLM_STREAM = _env_bool("LITERABLE_LLM_STREAM", True)
+# 채점 프롬프트에 지문 전체 대신 문항별 압축 컨텍스트(지문 핵심 문장/근거 문장)를 넣을지와 문장 수
+GRADING_CONTEXT = _env_bool("LITERABLE_GRADING_CONTEXT", True)
+GRADING_CONTEXT_EVIDENCE = _env_int("LITERABLE_GRADING_CONTEXT_EVIDENCE", 4)
+GRADING_CONTEXT_KEY_FACTS = _env_int("LITERABLE_GRADING_CONTEXT_KEY_FACTS", 3)
+# 요청 한 번의 입력 토큰 상한 (넘으면 지문 압축 → 지문/학생답안 잘라내기 순으로 줄임)
+LLM_MAX_INPUT_TOKENS = _env_int("LITERABLE_LLM_MAX_INPUT_TOKENS", 6000)
+# 실행 전 예상치 계산용: 백만 토큰당 가격(USD), 출력 상한 대비 평균 출력 비율, 요청 지연(고정 + 출력 속도)
+LLM_PRICE_INPUT_PER_1M = float(os.getenv("LITERABLE_LLM_PRICE_INPUT_PER_1M", "2.5"))
+LLM_PRICE_OUTPUT_PER_1M = float(os.getenv("LITERABLE_LLM_PRICE_OUTPUT_PER_1M", "10"))
+LLM_EXPECTED_OUTPUT_RATIO = float(os.getenv("LITERABLE_LLM_EXPECTED_OUTPUT_RATIO", "0.5"))
+LLM_BASE_LATENCY = float(os.getenv("LITERABLE_LLM_BASE_LATENCY", "1.0"))
+LLM_OUTPUT_TOKENS_PER_SECOND = float(os.getenv("LITERABLE_LLM_OUTPUT_TOKENS_PER_SECOND", "50"))
+# 프롬프트 파일 변경 확인 주기 (초) - 이 간격 안에서는 파일 시스템을 보지 않고 메모리의 프롬프트 사용
+PROMPT_RELOAD_INTERVAL = _env_int("LITERABLE_PROMPT_RELOAD_INTERVAL", 5)
+# 요청 한 번의 타임아웃과 재시도를 포함한 전체 마감 시간 (초)
+LLM_ATTEMPT_TIMEOUT = _env_int("LITERABLE_LLM_ATTEMPT_TIMEOUT", 30)
+LLM_DEADLINE = _env_int("LITERABLE_LLM_DEADLINE", 120)
+LLM_MAX_ATTEMPTS = _env_int("LITERABLE_LLM_MAX_ATTEMPTS", 6)
+LLM_MAX_BACKOFF = _env_int("LITERABLE_LLM_MAX_BACKOFF", 20)
+# 연속 실패 횟수가 넘으면 일정 시간 동안 호출하지 않고 바로 실패
+LLM_BREAKER_THRESHOLD = _env_int("LITERABLE_LLM_BREAKER_THRESHOLD", 5)
+LLM_BREAKER_RESET_SECONDS = _env_int("LITERABLE_LLM_BREAKER_RESET_SECONDS", 30)
+# 배포의 분당 요청/토큰 한도. 기본값 0 은 제한 없음 - 추측한 한도로 실제 할당량보다 느리게 채점하지 않도록
+# Azure 포털의 배포 할당량(Requests/Tokens per minute) 값을 그대로 LITERABLE_LLM_RPM/LITERABLE_LLM_TPM 에 지정해야
+# 한도에 맞춰 호출 속도를 조절한다 (채점 예상 시간 계산에도 쓰임). LLM_RATE_LIMIT_DB 를 지정하면 여러 프로세스가 한도를 공유
+LLM_RPM = _env_int("LITERABLE_LLM_RPM", 0)
+LLM_TPM = _env_int("LITERABLE_LLM_TPM", 0)
+LLM_RATE_LIMIT_DB = os.getenv("LITERABLE_LLM_RATE_LIMIT_DB", "")
+# LLM 호출용 keep-alive 연결 풀 크기 (동시 채점 수 이상) 와 HTTP/2 사용 여부 (httpx + h2 필요)
+LLM_HTTP_POOL_SIZE = _env_int("LITERABLE_LLM_HTTP_POOL_SIZE", max(LLM_MAX_CONCURRENCY, LLM_BATCH_CONCURRENCY))
+LLM_HTTP2 = _env_bool("LITERABLE_LLM_HTTP2", False)
+# 채점 결과 캐시: 최근 사용 기준 최대 항목 수와 보관 기간
+GRADING_CACHE_MAX_ENTRIES = _env_int("LITERABLE_GRADING_CACHE_MAX_ENTRIES", 50000)
+GRADING_CACHE_MAX_AGE_DAYS = _env_int("LITERABLE_GRADING_CACHE_MAX_AGE_DAYS", 90)
+# 유사 답안 재사용: off (사용 안 함), suggest (채점 화면에서 제안), auto (자동 적용)
+FUZZY_MATCH_MODE = os.getenv("LITERABLE_FUZZY_MATCH_MODE", "suggest")
+# 0~100, rapidfuzz.fuzz.ratio 기준
+FUZZY_MATCH_THRESHOLD = float(os.getenv("LITERABLE_FUZZY_MATCH_THRESHOLD", "95"))
+# 답이 정해져 있는 사실적 독해 문제에만 기본 적용 (쉼표로 구분)
+FUZZY_MATCH_CATEGORIES = tuple(
+    category.strip() for category in os.getenv("LITERABLE_FUZZY_MATCH_CATEGORIES", "사실적 독해").split(",")
+    if category.strip()
+)
@@ -1,6 +1,43 @@
 import streamlit as st
+import config
 from database_manager import db
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Callable
+
+
+def keyset_page(key: str, search_query: str, fetch_page: Callable[..., List[Tuple]], total: int,
+                page_size: int = config.LIST_PAGE_SIZE) -> List[Tuple]:
+    """이전/다음 버튼이 있는 keyset 페이지 목록 - 현재 페이지의 행 반환"""
+    cursors_key = f"{key}_cursors"
+    search_key = f"{key}_search"
+    # 검색어가 바뀌면 첫 페이지로
+    if st.session_state.get(search_key) != search_query or cursors_key not in st.session_state:
+        st.session_state[search_key] = search_query
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state[cursors_key]
+
+    # 다음 페이지 존재 여부를 알기 위해 한 행 더 조회
+    rows = fetch_page(after_id=cursors[-1], limit=page_size + 1)
+    if not rows and len(cursors) > 1:
+        # 커서 행이 삭제된 경우 처음부터 다시
+        st.session_state[cursors_key] = cursors = [None]
+        rows = fetch_page(after_id=None, limit=page_size + 1)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if total > page_size:
+        col1, col2, col3 = st.columns([1, 1, 6])
+        with col1:
+            if st.button("◀ 이전", key=f"{key}_prev", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            if st.button("다음 ▶", key=f"{key}_next", disabled=not has_next):
+                cursors.append(rows[-1][0])
+                st.rerun()
+        with col3:
+            start = (len(cursors) - 1) * page_size
+            st.caption(f"{start + 1}-{start + len(rows)} / 전체 {total:,}개")
+    return rows
 
 def manage_students():
     """학생 관리 UI 컴포넌트"""
@@ -22,7 +59,12 @@ def manage_students():
     # 학생 검색
     st.write("### 학생 검색")
     search_query = st.text_input("학생 이름 검색")
-    students = db.fetch_students(search_query)
+    students = keyset_page(
+        "student_list",
+        search_query,
+        lambda after_id, limit: db.fetch_students_page(search_query, after_id=after_id, limit=limit),
+        db.count_students(search_query)
+    )
 
     # 검색 결과 표시
     st.write("### 등록된 학생 목록")
@@ -158,7 +200,12 @@ def manage_passages_and_questions():
     st.header("📋 등록된 지문 목록")
     search_query = st.text_input("🔍 지문 검색", placeholder="제목 또는 내용으로 검색")
 
-    passages = db.fetch_passages(search_query)
+    passages = keyset_page(
+        "passage_list",
+        search_query,
+        lambda after_id, limit: db.fetch_passages_page(search_query, after_id=after_id, limit=limit),
+        db.count_passages(search_query)
+    )
     if not passages:
         st.info("📭 등록된 지문이 없습니다.")
         return
@@ -332,7 +379,7 @@ def manage_report():
     with col1:
         search_student = st.text_input("학생 이름/학번 검색")
 
-    students = db.fetch_students(search_student)
+    students = db.fetch_student_options(search_student)
     if not students:
         st.warning("검색된 학생이 없습니다.")
         return
@@ -351,7 +398,7 @@ def manage_report():
     with col1:
         search_passage = st.text_input("지문 제목 검색")
 
-    passages = db.fetch_passages(search_passage)
+    passages = db.fetch_passage_titles(search_passage, title_only=True)
     if not passages:
         st.warning("검색된 지문이 없습니다.")
         return
@@ -364,9 +411,10 @@ def manage_report():
             key="passage_select"
         )
 
-    # 선택된 지문 내용 표시
+    # 선택된 지문 내용 표시 (본문은 선택된 지문만 조회)
     with st.expander("지문 내용 보기", expanded=False):
-        st.write(selected_passage[2])
+        passage = db.fetch_passage(selected_passage[0])
+        st.write(passage[2] if passage else "")
 
     # 선택된 지문의 문제들 가져오기
     questions = db.fetch_questions(selected_passage[0])
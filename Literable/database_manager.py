@@ -1,384 +1,995 @@
+import queue
+import re
 import sqlite3
-from typing import List, Tuple, Optional, Dict, Any
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple, Optional, Dict, Any, Iterable, Iterator
 import streamlit as st
+import config
+from grading_context import condense, source_hash
+from migrations import bigram_text, has_bigram_index, has_search_index, init_schema, register_functions
+from rollups import rebuild_rollups
+
+
+# Named PRAGMA sets applied to every pooled connection (config.DB_PROFILE 로 선택)
+PERFORMANCE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # 읽기/쓰기 혼합 기본값: WAL 로 쓰기 중에도 대시보드 읽기가 막히지 않음
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,  # 64 MiB
+        'mmap_size': 268435456,  # 256 MiB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+    # 전원 손실에도 커밋 유실이 없어야 하는 환경
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16384,  # 16 MiB
+        'mmap_size': 0,
+        'busy_timeout': 10000,
+        'temp_store': 'MEMORY',
+    },
+    # 대량 적재/벤치마크용: 크래시 시 마지막 트랜잭션이 유실될 수 있음
+    'bulk_load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -262144,  # 256 MiB
+        'mmap_size': 1073741824,  # 1 GiB
+        'busy_timeout': 30000,
+        'temp_store': 'MEMORY',
+    },
+    # SQLite 기본값 그대로 사용
+    'legacy': {},
+}
+
+
+class ConnectionPool:
+    """Thread-aware pool of SQLite connections.
+
+    A thread holds one connection for the duration of its outermost
+    ``connection()`` block; nested blocks on the same thread reuse it and join
+    the same transaction. Streamlit runs each session's script on its own
+    thread, so connections are never shared between concurrent reruns.
+    """
+
+    def __init__(self, db_name: str, max_idle: int = 8, pragmas: Optional[Dict[str, Any]] = None):
+        self.db_name = db_name
+        self.pragmas = pragmas or {}
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_idle)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # 연결은 스레드 사이를 이동하므로 check_same_thread를 끈다 (동시에 한 스레드만 사용)
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        # 검색 색인 트리거가 쓰는 SQL 함수
+        register_functions(conn)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Yield this thread's connection; the outermost block commits or rolls back"""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            local.conn = None
+            self._release(conn)
+
+    def close_all(self) -> None:
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
 
 class DatabaseManager:
-    def __init__(self, db_name: str = "Literable.db"):
+    def __init__(self, db_name: str = config.DB_PATH, pool_size: int = config.DB_POOL_SIZE,
+                 profile: str = config.DB_PROFILE):
+        if profile not in PERFORMANCE_PROFILES:
+            raise ValueError(f"Unknown database profile: {profile!r} "
+                             f"(choose from {', '.join(PERFORMANCE_PROFILES)})")
         self.db_name = db_name
+        self.profile = profile
+        self.pool = ConnectionPool(db_name, max_idle=pool_size, pragmas=PERFORMANCE_PROFILES[profile])
         self.init_db()
+        with self.connection() as conn:
+            # SQLite 가 trigram(또는 FTS5)을 지원하지 않아 색인이 없으면 해당 검색어는 LIKE 로 처리
+            self.search_index = has_search_index(conn)
+            self.bigram_index = has_bigram_index(conn)
+        print(f"[Literable] database {db_name} profile={profile}: "
+              + ", ".join(f"{k}={v}" for k, v in self.effective_settings().items()))
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_name)
+    def connection(self):
+        """Pooled connection context; one transaction per outermost block"""
+        return self.pool.connection()
+
+    def effective_settings(self) -> Dict[str, Any]:
+        """Read back the PRAGMA values actually in effect on a pooled connection"""
+        with self.connection() as conn:
+            return {
+                name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size',
+                             'busy_timeout', 'temp_store')
+            }
 
     def init_db(self) -> None:
         """Initialize database with required tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Create students table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS students (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT,
-                        school TEXT,
-                        student_number TEXT
-                    )''')
-
-        # Create passages table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS passages (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT,
-                        passage TEXT
-                    )''')
-
-        # Create questions table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS questions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        passage_id INTEGER,
-                        question TEXT,
-                        model_answer TEXT,
-                        category TEXT DEFAULT '',
-                        FOREIGN KEY (passage_id) REFERENCES passages (id)
-                    )''')
-
-        # Create student_answers table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS student_answers (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        student_id INTEGER,
-                        question_id INTEGER,
-                        student_answer TEXT,
-                        score INTEGER,
-                        feedback TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(student_id, question_id), 
-                        FOREIGN KEY (student_id) REFERENCES students (id),
-                        FOREIGN KEY (question_id) REFERENCES questions (id)
-                    )''')
-
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            # 기본 테이블 생성 후 기존 DB 파일도 최신 스키마(인덱스 등)로 제자리 업그레이드
+            init_schema(conn)
 
     # Student related methods
     def fetch_students(self, search_query: Optional[str] = None) -> List[Tuple]:
         """Fetch students from database with optional search query"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.connection() as conn:
+            cursor = conn.cursor()
 
-        if search_query:
-            cursor.execute("SELECT * FROM students WHERE name LIKE ? OR student_number LIKE ?",
-                           (f'%{search_query}%', f'%{search_query}%'))
-        else:
-            cursor.execute("SELECT * FROM students")
+            if search_query:
+                cursor.execute("SELECT * FROM students WHERE name LIKE ? OR student_number LIKE ?",
+                               (f'%{search_query}%', f'%{search_query}%'))
+            else:
+                cursor.execute("SELECT * FROM students")
 
-        students = cursor.fetchall()
-        conn.close()
-        return students
+            return cursor.fetchall()
+
+    def fetch_student_options(self, search_query: Optional[str] = None) -> List[Tuple]:
+        """Fetch (id, name, school, student_number) for selectboxes"""
+        search_sql, search_params = self._student_search_condition(search_query)
+        with self.connection() as conn:
+            return conn.execute(f"""
+                SELECT id, name, school, student_number FROM students
+                WHERE {search_sql}
+                ORDER BY name, id
+            """, search_params).fetchall()
+
+    # Keyset pagination
+    # OFFSET 대신 직전 페이지 마지막 행의 (정렬키, id) 이후를 인덱스로 바로 찾으므로
+    # 몇 번째 페이지든 조회 비용이 같다.
+    _STUDENT_ORDER_COLUMNS = {'name': 'name', 'id': 'id'}
+    _PASSAGE_ORDER_COLUMNS = {'title': 'title', 'id': 'id'}
+
+    @staticmethod
+    def _keyset_condition(table: str, column: str, after_id: Optional[int]) -> Tuple[str, List[Any]]:
+        if after_id is None:
+            return "1", []
+        if column == 'id':
+            return "id > ?", [after_id]
+        return f"({column}, id) > ((SELECT {column} FROM {table} WHERE id = ?), ?)", [after_id, after_id]
+
+    @staticmethod
+    def _student_search_condition(search_query: Optional[str]) -> Tuple[str, List[Any]]:
+        if not search_query:
+            return "1", []
+        return "(name LIKE ? OR student_number LIKE ?)", [f'%{search_query}%', f'%{search_query}%']
+
+    def fetch_students_page(self, search_query: Optional[str] = None, after_id: Optional[int] = None,
+                            limit: int = 50, order_by: str = 'name') -> List[Tuple]:
+        """Fetch up to ``limit`` students ordered by name (or id) that come after ``after_id``"""
+        column = self._STUDENT_ORDER_COLUMNS[order_by]
+        search_sql, search_params = self._student_search_condition(search_query)
+        keyset_sql, keyset_params = self._keyset_condition('students', column, after_id)
+        order = "id" if column == 'id' else f"{column}, id"
+        with self.connection() as conn:
+            return conn.execute(f"""
+                SELECT * FROM students
+                WHERE {search_sql} AND {keyset_sql}
+                ORDER BY {order}
+                LIMIT ?
+            """, (*search_params, *keyset_params, limit)).fetchall()
+
+    def count_students(self, search_query: Optional[str] = None) -> int:
+        """Count students matching the optional search query"""
+        search_sql, search_params = self._student_search_condition(search_query)
+        with self.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM students WHERE {search_sql}", search_params).fetchone()[0]
 
     def add_student(self, name: str, school: str, student_number: str) -> None:
         """Add a new student to database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO students (name, school, student_number) VALUES (?, ?, ?)",
-                       (name, school, student_number))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("INSERT INTO students (name, school, student_number) VALUES (?, ?, ?)",
+                         (name, school, student_number))
 
     def update_student(self, student_id: int, name: str, school: str, student_number: str) -> None:
         """Update existing student information"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE students SET name = ?, school = ?, student_number = ? WHERE id = ?",
-                       (name, school, student_number, student_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE students SET name = ?, school = ?, student_number = ? WHERE id = ?",
+                         (name, school, student_number, student_id))
 
     def delete_student(self, student_id: int) -> None:
         """Delete a student from database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("DELETE FROM students WHERE id = ?", (student_id,))
 
     # Passage related methods
     def fetch_passages(self, search_query: str = "") -> List[Tuple]:
         """Fetch passages from database with optional search query"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
         if search_query:
-            cursor.execute("SELECT * FROM passages WHERE title LIKE ?", (f"%{search_query}%",))
-        else:
-            cursor.execute("SELECT * FROM passages")
-        passages = cursor.fetchall()
-        conn.close()
-        return passages
+            return self.search_passages(search_query, limit=None)
+        with self.connection() as conn:
+            return conn.execute("SELECT * FROM passages").fetchall()
+
+    def fetch_passage_titles(self, search_query: str = "", title_only: bool = False) -> List[Tuple]:
+        """Fetch (id, title) of passages without loading passage bodies
+
+        title_only 면 제목에서만 찾아 제목 순으로, 아니면 본문/문제까지 찾아 관련도 순으로 반환한다.
+        """
+        if search_query and title_only:
+            return self._search_titles(search_query)
+        if search_query:
+            return self._search_passages(search_query, None, "p.id, p.title")
+        with self.connection() as conn:
+            return conn.execute("SELECT id, title FROM passages ORDER BY title, id").fetchall()
+
+    def fetch_passage(self, passage_id: int) -> Optional[Tuple]:
+        """Fetch a single passage including its body"""
+        with self.connection() as conn:
+            return conn.execute("SELECT * FROM passages WHERE id = ?", (passage_id,)).fetchone()
+
+    # Full-text search
+    # 모든 검색어가 3글자 이상이면 trigram 색인(passages_fts/questions_fts)을, 2글자 검색어가 있으면
+    # bigram 색인(passages_bigram/questions_bigram)을 쓴다. bigram 색인은 글자/숫자로만 이루어진 검색어만
+    # 찾을 수 있으므로, 1글자 검색어나 문장부호가 섞인 짧은 검색어가 있으면 LIKE '%…%' 전체 탐색으로 처리한다.
+    _FTS_MIN_TERM_LENGTH = 3
+    _BIGRAM_TERM = re.compile(r"[^\W_]{2,}")
+    _SEARCH_TABLES = {
+        'trigram': ('passages_fts', 'questions_fts'),
+        'bigram': ('passages_bigram', 'questions_bigram'),
+    }
+    # bm25 가중치: 제목 일치를 본문 일치보다, 지문 일치를 문제 일치보다 우선
+    _PASSAGE_FTS_WEIGHTS = (10.0, 1.0)
+    _QUESTION_MATCH_FACTOR = 0.5
+
+    def _search_index(self, terms: List[str]) -> Optional[str]:
+        """Index that can answer every term: 'trigram', 'bigram' or None (LIKE)"""
+        if self.search_index and all(len(term) >= self._FTS_MIN_TERM_LENGTH for term in terms):
+            return 'trigram'
+        if self.bigram_index and all(self._BIGRAM_TERM.fullmatch(term) for term in terms):
+            return 'bigram'
+        return None
+
+    @staticmethod
+    def _search_terms(query: str) -> List[str]:
+        return [term for term in query.split() if term]
+
+    @staticmethod
+    def _fts_match_expression(terms: List[str], index: str = 'trigram') -> str:
+        # 각 검색어를 문자열 리터럴로 감싸 FTS5 쿼리 문법(AND, NEAR, * 등)으로 해석되지 않게 함.
+        # bigram 색인에서는 검색어의 bigram 들이 연속으로 나오는 구(phrase)가 된다
+        if index == 'bigram':
+            terms = [bigram_text(term) for term in terms]
+        return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def search_passages(self, query: str, limit: Optional[int] = 50) -> List[Tuple]:
+        """Ranked search over passage titles, bodies, question text and model answers
+
+        3글자 이상 검색어는 trigram, 2글자 검색어는 bigram FTS5 색인으로 순위를 매긴다.
+        1글자 검색어 등 색인으로 찾을 수 없는 검색어는 LIKE 로 찾아 제목 일치를 먼저 보여준다.
+        """
+        return self._search_passages(query, limit, "p.*")
+
+    def _search_passages(self, query: str, limit: Optional[int], columns: str) -> List[Tuple]:
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        limit = -1 if limit is None else limit
+
+        with self.connection() as conn:
+            index = self._search_index(terms)
+            if index:
+                passages_fts, questions_fts = self._SEARCH_TABLES[index]
+                match = self._fts_match_expression(terms, index)
+                title_weight, body_weight = self._PASSAGE_FTS_WEIGHTS
+                return conn.execute(f"""
+                    WITH hits(passage_id, rank) AS (
+                        SELECT rowid, bm25({passages_fts}, ?, ?)
+                        FROM {passages_fts} WHERE {passages_fts} MATCH ?
+                        UNION ALL
+                        SELECT q.passage_id, bm25({questions_fts}) * ?
+                        FROM {questions_fts} JOIN questions q ON q.id = {questions_fts}.rowid
+                        WHERE {questions_fts} MATCH ?
+                    )
+                    SELECT {columns}
+                    FROM (SELECT passage_id, MIN(rank) AS rank FROM hits GROUP BY passage_id) h
+                    JOIN passages p ON p.id = h.passage_id
+                    ORDER BY h.rank, p.id
+                    LIMIT ?
+                """, (title_weight, body_weight, match, self._QUESTION_MATCH_FACTOR, match, limit)).fetchall()
+
+            # 색인으로 찾을 수 없는 검색어: 제목 일치를 먼저 표시
+            condition, params = self._passage_search_condition(terms)
+            return conn.execute(f"""
+                SELECT {columns} FROM passages p
+                WHERE {condition}
+                ORDER BY p.title NOT LIKE ?, p.id
+                LIMIT ?
+            """, (*params, f"%{terms[0]}%", limit)).fetchall()
+
+    def _search_titles(self, query: str) -> List[Tuple]:
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        with self.connection() as conn:
+            index = self._search_index(terms)
+            if index:
+                passages_fts = self._SEARCH_TABLES[index][0]
+                # FTS5 열 필터로 title 열에서만 찾는다
+                match = f"title : ({self._fts_match_expression(terms, index)})"
+                return conn.execute(f"""
+                    SELECT p.id, p.title
+                    FROM {passages_fts} JOIN passages p ON p.id = {passages_fts}.rowid
+                    WHERE {passages_fts} MATCH ?
+                    ORDER BY p.title, p.id
+                """, (match,)).fetchall()
+            conditions = " AND ".join("title LIKE ?" for _ in terms)
+            return conn.execute(f"SELECT id, title FROM passages WHERE {conditions} ORDER BY title, id",
+                                [f"%{term}%" for term in terms]).fetchall()
+
+    def _passage_search_condition(self, terms: List[str]) -> Tuple[str, List[Any]]:
+        """WHERE condition on alias p matching passages whose text or questions contain every term"""
+        index = self._search_index(terms)
+        if index:
+            passages_fts, questions_fts = self._SEARCH_TABLES[index]
+            match = self._fts_match_expression(terms, index)
+            return f"""p.id IN (
+                SELECT rowid FROM {passages_fts} WHERE {passages_fts} MATCH ?
+                UNION
+                SELECT q.passage_id FROM {questions_fts} JOIN questions q ON q.id = {questions_fts}.rowid
+                WHERE {questions_fts} MATCH ?
+            )""", [match, match]
+
+        conditions = []
+        params: List[Any] = []
+        for term in terms:
+            pattern = f"%{term}%"
+            conditions.append("""(
+                p.title LIKE ? OR p.passage LIKE ? OR EXISTS (
+                    SELECT 1 FROM questions q
+                    WHERE q.passage_id = p.id AND (q.question LIKE ? OR q.model_answer LIKE ?)
+                ))""")
+            params.extend([pattern] * 4)
+        return " AND ".join(conditions), params
+
+    def search_questions(self, query: str, limit: Optional[int] = 50) -> List[Tuple]:
+        """Ranked search over question text and model answers"""
+        terms = self._search_terms(query)
+        if not terms:
+            return []
+        limit = -1 if limit is None else limit
+
+        with self.connection() as conn:
+            index = self._search_index(terms)
+            if index:
+                questions_fts = self._SEARCH_TABLES[index][1]
+                return conn.execute(f"""
+                    SELECT q.*
+                    FROM {questions_fts} JOIN questions q ON q.id = {questions_fts}.rowid
+                    WHERE {questions_fts} MATCH ?
+                    ORDER BY bm25({questions_fts}), q.id
+                    LIMIT ?
+                """, (self._fts_match_expression(terms, index), limit)).fetchall()
+
+            conditions = " AND ".join("(question LIKE ? OR model_answer LIKE ?)" for _ in terms)
+            params = [pattern for term in terms for pattern in (f"%{term}%", f"%{term}%")]
+            return conn.execute(f"SELECT * FROM questions WHERE {conditions} ORDER BY id LIMIT ?",
+                                (*params, limit)).fetchall()
+
+    def fetch_passages_page(self, search_query: str = "", after_id: Optional[int] = None,
+                            limit: int = 20, order_by: str = 'title') -> List[Tuple]:
+        """Fetch up to ``limit`` passages ordered by title (or id) that come after ``after_id``"""
+        column = self._PASSAGE_ORDER_COLUMNS[order_by]
+        terms = self._search_terms(search_query or "")
+        search_sql, search_params = self._passage_search_condition(terms) if terms else ("1", [])
+        keyset_sql, keyset_params = self._keyset_condition('passages', column, after_id)
+        order = "id" if column == 'id' else f"{column}, id"
+        with self.connection() as conn:
+            return conn.execute(f"""
+                SELECT p.* FROM passages p
+                WHERE {search_sql} AND {keyset_sql}
+                ORDER BY {order}
+                LIMIT ?
+            """, (*search_params, *keyset_params, limit)).fetchall()
+
+    def count_passages(self, search_query: str = "") -> int:
+        """Count passages matching the optional search query"""
+        terms = self._search_terms(search_query or "")
+        search_sql, search_params = self._passage_search_condition(terms) if terms else ("1", [])
+        with self.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM passages p WHERE {search_sql}",
+                                search_params).fetchone()[0]
 
     def add_passage(self, title: str, passage: str) -> int:
         """Add a new passage to database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO passages (title, passage) VALUES (?, ?)", (title, passage))
-        passage_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return passage_id
+        with self.connection() as conn:
+            cursor = conn.execute("INSERT INTO passages (title, passage) VALUES (?, ?)", (title, passage))
+            return cursor.lastrowid
 
     def update_passage(self, passage_id: int, title: str, passage: str) -> None:
         """Update existing passage"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE passages SET title = ?, passage = ? WHERE id = ?",
-                       (title, passage, passage_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE passages SET title = ?, passage = ? WHERE id = ?",
+                         (title, passage, passage_id))
+        self.refresh_grading_contexts(passage_id=passage_id)
 
     def delete_passage(self, passage_id: int) -> None:
         """Delete a passage and its related questions"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        # Delete related student answers
-        cursor.execute("""
-            DELETE FROM student_answers 
-            WHERE question_id IN (
-                SELECT id FROM questions WHERE passage_id = ?
-            )
-        """, (passage_id,))
-        # Delete related questions
-        cursor.execute("DELETE FROM questions WHERE passage_id = ?", (passage_id,))
-        # Delete passage
-        cursor.execute("DELETE FROM passages WHERE id = ?", (passage_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # Delete related student answers
+            cursor.execute("""
+                DELETE FROM student_answers 
+                WHERE question_id IN (
+                    SELECT id FROM questions WHERE passage_id = ?
+                )
+            """, (passage_id,))
+            # Delete related questions
+            cursor.execute("DELETE FROM questions WHERE passage_id = ?", (passage_id,))
+            # Delete passage
+            cursor.execute("DELETE FROM passages WHERE id = ?", (passage_id,))
 
     # Question related methods
     def fetch_questions(self, passage_id: int) -> List[Tuple]:
         """Fetch questions for a specific passage"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute('SELECT * FROM questions WHERE passage_id = ?', (passage_id,))
-            questions = cursor.fetchall()
-            return questions
-        finally:
-            conn.close()
+        with self.connection() as conn:
+            return conn.execute('SELECT * FROM questions WHERE passage_id = ?', (passage_id,)).fetchall()
 
-    def add_question(self, passage_id: int, question: str, model_answer: str, category: str) -> None:
+    def add_question(self, passage_id: int, question: str, model_answer: str, category: str) -> int:
         """Add a new question to database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute('''INSERT INTO questions (passage_id, question, model_answer, category)
-                            VALUES (?, ?, ?, ?)''', (passage_id, question, model_answer, category))
-            conn.commit()
-        finally:
-            conn.close()
+        with self.connection() as conn:
+            question_id = conn.execute('''INSERT INTO questions (passage_id, question, model_answer, category)
+                                         VALUES (?, ?, ?, ?)''',
+                                       (passage_id, question, model_answer, category)).lastrowid
+        self.refresh_grading_contexts([question_id])
+        return question_id
 
     def update_question(self, question_id: int, question: str, model_answer: str, category: str) -> None:
         """Update existing question"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE questions SET question = ?, model_answer = ?, category = ? WHERE id = ?",
-                       (question, model_answer, category, question_id))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("UPDATE questions SET question = ?, model_answer = ?, category = ? WHERE id = ?",
+                         (question, model_answer, category, question_id))
+        self.refresh_grading_contexts([question_id])
 
     def delete_question(self, question_id: int) -> None:
         """Delete a question and its related answers"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        # Delete related student answers first
-        cursor.execute("DELETE FROM student_answers WHERE question_id = ?", (question_id,))
-        # Delete the question
-        cursor.execute("DELETE FROM questions WHERE id = ?", (question_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # Delete related student answers first
+            cursor.execute("DELETE FROM student_answers WHERE question_id = ?", (question_id,))
+            # Delete the question
+            cursor.execute("DELETE FROM questions WHERE id = ?", (question_id,))
+
+    # Condensed grading context (grading_context.condense)
+    def refresh_grading_contexts(self, question_ids: Optional[Iterable[int]] = None,
+                                 passage_id: Optional[int] = None) -> Dict[int, str]:
+        """Return {question_id: condensed context}, recomputing entries that are missing or stale
+
+        문제/지문 저장 시 미리 계산해 두며, 저장 경로를 거치지 않은 데이터(가져오기, 합성 데이터)나
+        압축 방식이 바뀐 경우에는 채점 직전에 여기서 계산된다.
+        """
+        if passage_id is not None:
+            condition, params = "q.passage_id = ?", [passage_id]
+        else:
+            params = list(question_ids or [])
+            if not params:
+                return {}
+            condition = f"q.id IN ({', '.join('?' * len(params))})"
+
+        with self.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT q.id, COALESCE(p.passage, ''), q.question, q.model_answer, c.source_hash, c.context
+                FROM questions q
+                JOIN passages p ON p.id = q.passage_id
+                LEFT JOIN grading_contexts c ON c.question_id = q.id
+                WHERE {condition}
+            """, params).fetchall()
+
+        contexts: Dict[int, str] = {}
+        stale = []
+        for question_id, passage, question, model_answer, stored_hash, context in rows:
+            current_hash = source_hash(passage, question, model_answer)
+            if stored_hash != current_hash:
+                context = condense(passage, question, model_answer)
+                stale.append((question_id, current_hash, context))
+            contexts[question_id] = context
+
+        if stale:
+            with self.connection() as conn:
+                conn.executemany("""
+                    INSERT INTO grading_contexts (question_id, source_hash, context) VALUES (?, ?, ?)
+                    ON CONFLICT(question_id) DO UPDATE SET
+                        source_hash = excluded.source_hash,
+                        context = excluded.context,
+                        created_at = CURRENT_TIMESTAMP
+                """, stale)
+        return contexts
 
     # Student Answer related methods
     def fetch_student_answers(self, student_id: int, passage_id: Optional[int] = None) -> List[Tuple]:
         """학생 답안 조회 함수 수정"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
         try:
-            if passage_id is not None:
-                # 특정 지문에 대한 답안 조회
-                cursor.execute("""
-                    SELECT 
-                        sa.id, 
-                        sa.student_id, 
-                        sa.question_id, 
-                        sa.student_answer, 
-                        COALESCE(sa.score, 0) as score,
-                        COALESCE(sa.feedback, '') as feedback,
-                        sa.created_at,
-                        q.question, 
-                        q.model_answer
-                    FROM questions q
-                    LEFT JOIN student_answers sa ON q.id = sa.question_id AND sa.student_id = ?
-                    WHERE q.passage_id = ?
-                    ORDER BY q.id
-                """, (student_id, passage_id))
-            else:
-                # 모든 답안 조회 (답안이 있는 것만)
-                cursor.execute("""
-                    SELECT 
-                        sa.id, 
-                        sa.student_id, 
-                        sa.question_id, 
-                        sa.student_answer,
-                        COALESCE(sa.score, 0) as score,
-                        COALESCE(sa.feedback, '') as feedback,
-                        sa.created_at,
-                        q.question, 
-                        q.model_answer
-                    FROM student_answers sa
-                    JOIN questions q ON sa.question_id = q.id
-                    WHERE sa.student_id = ? AND sa.score IS NOT NULL
-                    ORDER BY sa.created_at DESC
-                """, (student_id,))
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                if passage_id is not None:
+                    # 특정 지문에 대한 답안 조회
+                    cursor.execute("""
+                        SELECT 
+                            sa.id, 
+                            sa.student_id, 
+                            sa.question_id, 
+                            sa.student_answer, 
+                            COALESCE(sa.score, 0) as score,
+                            COALESCE(sa.feedback, '') as feedback,
+                            sa.created_at,
+                            q.question, 
+                            q.model_answer
+                        FROM questions q
+                        LEFT JOIN student_answers sa ON q.id = sa.question_id AND sa.student_id = ?
+                        WHERE q.passage_id = ?
+                        ORDER BY q.id
+                    """, (student_id, passage_id))
+                else:
+                    # 모든 답안 조회 (답안이 있는 것만)
+                    cursor.execute("""
+                        SELECT 
+                            sa.id, 
+                            sa.student_id, 
+                            sa.question_id, 
+                            sa.student_answer,
+                            COALESCE(sa.score, 0) as score,
+                            COALESCE(sa.feedback, '') as feedback,
+                            sa.created_at,
+                            q.question, 
+                            q.model_answer
+                        FROM student_answers sa
+                        JOIN questions q ON sa.question_id = q.id
+                        WHERE sa.student_id = ? AND sa.score IS NOT NULL
+                        ORDER BY sa.created_at DESC
+                    """, (student_id,))
 
-            return cursor.fetchall()
+                return cursor.fetchall()
         except sqlite3.Error as e:
             print(f"Error fetching student answers: {e}")
             return []
-        finally:
-            conn.close()
 
-    def save_student_answer(self, student_id: int, question_id: int, answer: str, score: int, feedback: str) -> bool:
+    # (student_id, question_id) UNIQUE 제약을 이용한 단일 문장 저장
+    _UPSERT_ANSWER_SQL = """
+        INSERT INTO student_answers
+        (student_id, question_id, student_answer, score, feedback, prompt_version, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(student_id, question_id) DO UPDATE SET
+            student_answer = excluded.student_answer,
+            score = excluded.score,
+            feedback = excluded.feedback,
+            prompt_version = excluded.prompt_version,
+            created_at = CURRENT_TIMESTAMP
+    """
+
+    def save_student_answer(self, student_id: int, question_id: int, answer: str, score: int, feedback: str,
+                            prompt_version: Optional[str] = None) -> bool:
         """Save or update a student's answer in the database."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        return self.save_student_answers_bulk([(student_id, question_id, answer, score, feedback, prompt_version)])
 
+    def save_student_answers_bulk(self, rows: Iterable[Tuple]) -> bool:
+        """Upsert many (student_id, question_id, answer, score, feedback[, prompt_version]) rows in one transaction"""
         try:
-            # 기존 답안이 있는지 확인
-            cursor.execute("""
-                SELECT id FROM student_answers 
-                WHERE student_id = ? AND question_id = ?
-            """, (student_id, question_id))
-
-            existing_answer = cursor.fetchone()
-
-            if existing_answer:
-                # 기존 답안이 있으면 UPDATE
-                cursor.execute("""
-                    UPDATE student_answers 
-                    SET student_answer = ?, 
-                        score = ?, 
-                        feedback = ?, 
-                        created_at = CURRENT_TIMESTAMP
-                    WHERE student_id = ? AND question_id = ?
-                """, (answer, score, feedback, student_id, question_id))
-            else:
-                # 새로운 답안이면 INSERT
-                cursor.execute("""
-                    INSERT INTO student_answers 
-                    (student_id, question_id, student_answer, score, feedback, created_at)
-                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (student_id, question_id, answer, score, feedback))
-
-            conn.commit()
+            with self.connection() as conn:
+                conn.executemany(self._UPSERT_ANSWER_SQL, (tuple(row) + (None,) * (6 - len(row)) for row in rows))
             return True
         except sqlite3.Error as e:
-            print(f"Error saving student answer: {e}")
-            conn.rollback()
+            print(f"Error saving student answers: {e}")
             return False
-        finally:
-            conn.close()
 
     def delete_student_answer(self, answer_id: int) -> None:
         """Delete a student answer"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM student_answers WHERE id = ?", (answer_id,))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute("DELETE FROM student_answers WHERE id = ?", (answer_id,))
+
+    # Batch grading jobs
+    GRADING_SCOPES = ('ungraded', 'school', 'all')
+
+    def fetch_schools(self) -> List[str]:
+        """Fetch distinct school names"""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT school FROM students WHERE school IS NOT NULL AND school <> '' ORDER BY school")]
+
+    def create_grading_job(self, passage_id: int, scope: str, school: Optional[str] = None) -> Tuple[int, int]:
+        """Create a batch grading job over a passage's answers; returns (job_id, item_count)
+
+        scope: 'ungraded' (점수나 첨삭이 없는 답안), 'school' (해당 학교 학생의 모든 답안), 'all' (모든 답안)
+        """
+        if scope not in self.GRADING_SCOPES:
+            raise ValueError(f"Unknown grading scope: {scope!r}")
+        conditions = ["q.passage_id = ?"]
+        params: List[Any] = [passage_id]
+        if scope == 'ungraded':
+            conditions.append("(sa.score IS NULL OR COALESCE(sa.feedback, '') = '')")
+        elif scope == 'school':
+            conditions.append("s.school = ?")
+            params.append(school)
+
+        with self.connection() as conn:
+            job_id = conn.execute("INSERT INTO grading_jobs (passage_id, scope, school) VALUES (?, ?, ?)",
+                                  (passage_id, scope, school if scope == 'school' else None)).lastrowid
+            item_count = conn.execute(f"""
+                INSERT INTO grading_job_items (job_id, answer_id)
+                SELECT ?, sa.id
+                FROM questions q
+                JOIN student_answers sa ON sa.question_id = q.id
+                JOIN students s ON s.id = sa.student_id
+                WHERE {" AND ".join(conditions)}
+                ORDER BY s.name, s.id, q.id
+            """, (job_id, *params)).rowcount
+        return job_id, item_count
+
+    def fetch_grading_jobs(self, passage_id: Optional[int] = None, limit: int = 20) -> List[Tuple]:
+        """Fetch (id, passage_id, title, scope, school, created_at, total, done, failed) of recent jobs"""
+        with self.connection() as conn:
+            return conn.execute("""
+                SELECT j.id, j.passage_id, p.title, j.scope, j.school, j.created_at,
+                       COUNT(i.id),
+                       COALESCE(SUM(i.status = 'done'), 0),
+                       COALESCE(SUM(i.status = 'failed'), 0)
+                FROM grading_jobs j
+                JOIN passages p ON p.id = j.passage_id
+                LEFT JOIN grading_job_items i ON i.job_id = j.id
+                WHERE ? IS NULL OR j.passage_id = ?
+                GROUP BY j.id
+                ORDER BY j.id DESC
+                LIMIT ?
+            """, (passage_id, passage_id, limit)).fetchall()
+
+    def get_grading_job_progress(self, job_id: int,
+                                 max_attempts: int = config.LLM_BATCH_MAX_ATTEMPTS) -> Dict[str, int]:
+        """Count a job's items per status, plus 'exhausted': failed items with no attempts left"""
+        with self.connection() as conn:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM grading_job_items WHERE job_id = ? GROUP BY status", (job_id,)))
+            exhausted = conn.execute("""
+                SELECT COUNT(*) FROM grading_job_items
+                WHERE job_id = ? AND status = 'failed' AND attempts >= ?
+            """, (job_id, max_attempts)).fetchone()[0]
+        progress = {status: counts.get(status, 0) for status in ('pending', 'running', 'done', 'failed')}
+        progress['exhausted'] = exhausted
+        return progress
+
+    # 재시도 가능한 항목: 대기 중, 임대가 만료된 실행 중(중단된 실행), 이번 실행이 아직 시도하지 않은 실패 항목
+    _JOB_ITEMS_SQL = """
+        SELECT i.id, sa.id, sa.student_id, st.name, sa.question_id, q.question, q.model_answer,
+               sa.student_answer, COALESCE(q.category, ''), COALESCE(p.passage, '')
+        FROM grading_job_items i
+        JOIN student_answers sa ON sa.id = i.answer_id
+        JOIN questions q ON q.id = sa.question_id
+        JOIN passages p ON p.id = q.passage_id
+        JOIN students st ON st.id = sa.student_id
+        WHERE i.job_id = :job_id
+          AND (i.status = 'pending'
+               OR (i.status = 'running' AND COALESCE(i.leased_until, 0) < :now)
+               OR (i.status = 'failed' AND i.attempts < :max_attempts
+                   AND COALESCE(i.run_token, '') <> :run_token))
+        ORDER BY q.id, i.id
+        LIMIT :limit
+    """
+
+    @staticmethod
+    def _job_item(row: Tuple) -> Dict[str, Any]:
+        return {
+            'item_id': row[0],
+            'answer_id': row[1],
+            'student_id': row[2],
+            'student_name': row[3],
+            'question_id': row[4],
+            'question_text': row[5],
+            'model_answer': row[6],
+            'student_answer': row[7],
+            'category': row[8],
+            'passage_text': row[9],
+        }
+
+    def fetch_grading_job_items(self, job_id: int, max_attempts: int) -> List[Dict[str, Any]]:
+        """Return the items the next run of a job would grade, without claiming them"""
+        with self.connection() as conn:
+            rows = conn.execute(self._JOB_ITEMS_SQL, {
+                'job_id': job_id, 'now': time.time(), 'max_attempts': max_attempts, 'run_token': '', 'limit': -1
+            }).fetchall()
+        return [self._job_item(row) for row in rows]
+
+    def claim_grading_job_items(self, job_id: int, max_attempts: int, run_token: str, limit: int = -1,
+                                lease_seconds: int = config.LLM_BATCH_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Lease up to limit unfinished items of a job to run_token and return them with their answer data
+
+        쓰기 잠금(BEGIN IMMEDIATE) 안에서 고르고 표시하므로 같은 작업을 동시에 실행해도 한 항목은 한 실행만
+        가져간다. 실행 중 항목은 임대가 만료된 경우(중단된 실행)에만, 실패 항목은 이번 실행에서 아직
+        시도하지 않은 경우에만 다시 가져온다. 같은 문항의 요청이 이어지도록(프롬프트 캐시 적중) 문항 순으로 반환한다.
+        """
+        with self.connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            rows = conn.execute(self._JOB_ITEMS_SQL, {
+                'job_id': job_id, 'now': now, 'max_attempts': max_attempts, 'run_token': run_token, 'limit': limit
+            }).fetchall()
+            conn.executemany("""
+                UPDATE grading_job_items
+                SET status = 'running', attempts = attempts + 1, run_token = ?, leased_until = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(run_token, now + lease_seconds, row[0]) for row in rows])
+
+        return [self._job_item(row) for row in rows]
+
+    def complete_grading_job_item(self, item_id: int, student_id: int, question_id: int, answer: str,
+                                  score: int, feedback: str, prompt_version: Optional[str] = None,
+                                  run_token: Optional[str] = None) -> bool:
+        """Save a graded answer and mark its job item done in one transaction"""
+        try:
+            with self.connection() as conn:
+                conn.execute(self._UPSERT_ANSWER_SQL,
+                             (student_id, question_id, answer, score, feedback, prompt_version))
+                conn.execute("""
+                    UPDATE grading_job_items
+                    SET status = 'done', error = NULL, leased_until = NULL, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND (? IS NULL OR run_token = ?)
+                """, (item_id, run_token, run_token))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving graded answer: {e}")
+            return False
+
+    def fail_grading_job_item(self, item_id: int, error: str, count_attempt: bool = True,
+                              run_token: Optional[str] = None) -> None:
+        """Mark a job item failed with the error message (count_attempt=False gives the attempt back)
+
+        run_token 이 있으면 그 실행이 아직 임대 중인 항목만 바꾼다 (다른 실행이 이어받은 항목은 건드리지 않음).
+        """
+        with self.connection() as conn:
+            conn.execute("""
+                UPDATE grading_job_items
+                SET status = 'failed', error = ?, attempts = attempts - ?, leased_until = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND (? IS NULL OR run_token = ?) AND status = 'running'
+            """, (error, 0 if count_attempt else 1, item_id, run_token, run_token))
+
+    def release_grading_job_item(self, item_id: int, run_token: str) -> bool:
+        """Give a leased item back as pending without using up an attempt (it was never sent)"""
+        with self.connection() as conn:
+            return conn.execute("""
+                UPDATE grading_job_items
+                SET status = 'pending', attempts = MAX(attempts - 1, 0), run_token = NULL, leased_until = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND run_token = ? AND status = 'running'
+            """, (item_id, run_token)).rowcount > 0
+
+    def reset_failed_grading_job_items(self, job_id: int) -> int:
+        """Put a job's failed items back in the queue with their attempt count reset; returns how many"""
+        with self.connection() as conn:
+            return conn.execute("""
+                UPDATE grading_job_items
+                SET status = 'pending', attempts = 0, error = NULL, run_token = NULL, leased_until = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND status = 'failed'
+            """, (job_id,)).rowcount
+
+    def fetch_grading_job_failures(self, job_id: int) -> List[Tuple]:
+        """Fetch (student name, question, attempts, error) of a job's failed items"""
+        with self.connection() as conn:
+            return conn.execute("""
+                SELECT st.name, q.question, i.attempts, i.error
+                FROM grading_job_items i
+                JOIN student_answers sa ON sa.id = i.answer_id
+                JOIN questions q ON q.id = sa.question_id
+                JOIN students st ON st.id = sa.student_id
+                WHERE i.job_id = ? AND i.status = 'failed'
+                ORDER BY i.id
+            """, (job_id,)).fetchall()
+
+    def fetch_graded_answers(self, question_id: int) -> List[Tuple]:
+        """Fetch (student_id, student_answer, score, feedback) of a question's graded answers"""
+        with self.connection() as conn:
+            return conn.execute("""
+                SELECT student_id, student_answer, score, feedback
+                FROM student_answers
+                WHERE question_id = ? AND score IS NOT NULL AND COALESCE(feedback, '') <> ''
+            """, (question_id,)).fetchall()
+
+    # Grading cache
+    def get_cached_grading(self, key: str, now: float) -> Optional[Tuple[int, str]]:
+        """Look up a cached (score, feedback) and mark it as used"""
+        with self.connection() as conn:
+            row = conn.execute("SELECT score, feedback FROM grading_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE grading_cache SET last_used_at = ? WHERE key = ?", (now, key))
+            return row
+
+    def put_cached_grading(self, key: str, score: int, feedback: str, now: float) -> None:
+        """Store a grading result in the cache"""
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO grading_cache (key, score, feedback, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    score = excluded.score,
+                    feedback = excluded.feedback,
+                    created_at = excluded.created_at,
+                    last_used_at = excluded.last_used_at
+            """, (key, score, feedback, now, now))
+
+    def evict_grading_cache(self, max_entries: int, oldest_used_at: float) -> int:
+        """Drop cache entries unused since oldest_used_at and all but the max_entries most recently used"""
+        with self.connection() as conn:
+            removed = conn.execute("DELETE FROM grading_cache WHERE last_used_at < ?", (oldest_used_at,)).rowcount
+            removed += conn.execute("""
+                DELETE FROM grading_cache WHERE last_used_at < (
+                    SELECT last_used_at FROM grading_cache ORDER BY last_used_at DESC LIMIT 1 OFFSET ?
+                )
+            """, (max_entries - 1,)).rowcount
+        return removed
+
+    def count_cached_gradings(self) -> int:
+        """Count grading cache entries"""
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM grading_cache").fetchone()[0]
 
     # Statistics related methods
+    # 집계는 트리거가 관리하는 stats_* 롤업 테이블(rollups.py)에서 읽는다.
+    @staticmethod
+    def _rollup_summary(row: Optional[Tuple]) -> Dict[str, Any]:
+        """Turn (answer_count, score_count, score_sum, score_sumsq, score_min, score_max) into a summary"""
+        answer_count, score_count, score_sum, score_sumsq, score_min, score_max = row or (0, 0, 0, 0, None, None)
+        average = score_sum / score_count if score_count else None
+        variance = max(score_sumsq / score_count - average * average, 0.0) if score_count else None
+        return {
+            'answers': answer_count,
+            'scored': score_count,
+            'average': average,
+            'stddev': variance ** 0.5 if variance is not None else None,
+            'min': score_min,
+            'max': score_max,
+        }
+
+    _ROLLUP_COLUMNS = "answer_count, score_count, score_sum, score_sumsq, score_min, score_max"
+
     def get_overall_statistics(self) -> Dict[str, Any]:
         """Get overall statistics from the database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Get average score
-        cursor.execute("SELECT AVG(score) FROM student_answers")
-        avg_score = cursor.fetchone()[0] or 0
-
-        # Get total answers count
-        cursor.execute("SELECT COUNT(*) FROM student_answers")
-        total_answers = cursor.fetchone()[0] or 0
-
-        # Get grade distribution
-        cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN score >= 90 THEN 'A (90-100)'
-                    WHEN score >= 80 THEN 'B (80-89)'
-                    WHEN score >= 70 THEN 'C (70-79)'
-                    WHEN score >= 60 THEN 'D (60-69)'
-                    ELSE 'F (0-59)'
-                END as grade,
-                COUNT(*) as count
-            FROM student_answers
-            GROUP BY grade
-            ORDER BY grade
-        """)
-        grade_distribution = cursor.fetchall()
-
-        conn.close()
+        with self.connection() as conn:
+            overall = self._rollup_summary(conn.execute(
+                f"SELECT {self._ROLLUP_COLUMNS} FROM stats_overall WHERE id = 1").fetchone())
+            grade_distribution = conn.execute("""
+                SELECT grade, answer_count FROM stats_grade
+                WHERE answer_count > 0
+                ORDER BY grade
+            """).fetchall()
+
         return {
-            'average_score': avg_score,
-            'total_answers': total_answers,
+            'average_score': overall['average'] or 0,
+            'total_answers': overall['answers'],
             'grade_distribution': grade_distribution
         }
 
+    def get_category_statistics(self) -> List[Dict[str, Any]]:
+        """Get score summaries per question category"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT category, {self._ROLLUP_COLUMNS} FROM stats_category ORDER BY category").fetchall()
+        return [{'category': row[0], **self._rollup_summary(row[1:])} for row in rows]
+
+    def get_daily_statistics(self, start_day: Optional[str] = None, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get score summaries per submission day (YYYY-MM-DD, inclusive range)"""
+        with self.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT day, {self._ROLLUP_COLUMNS} FROM stats_day
+                WHERE day >= COALESCE(?, '') AND day <= COALESCE(?, '9999-12-31')
+                ORDER BY day
+            """, (start_day, end_day)).fetchall()
+        return [{'day': row[0], **self._rollup_summary(row[1:])} for row in rows]
+
+    def rebuild_statistics(self) -> None:
+        """Recompute every statistics rollup table from student_answers"""
+        with self.connection() as conn:
+            rebuild_rollups(conn)
+
     def get_student_with_answers(self) -> List[Tuple]:
         """답안이 있는 학생만 조회하는 새로운 함수"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
         try:
-            cursor.execute("""
-                SELECT DISTINCT s.* 
-                FROM students s
-                JOIN student_answers sa ON s.id = sa.student_id
-                WHERE sa.score IS NOT NULL
-                ORDER BY s.name
-            """)
-            return cursor.fetchall()
+            with self.connection() as conn:
+                return conn.execute("""
+                    SELECT DISTINCT s.* 
+                    FROM students s
+                    JOIN student_answers sa ON s.id = sa.student_id
+                    WHERE sa.score IS NOT NULL
+                    ORDER BY s.name
+                """).fetchall()
         except sqlite3.Error as e:
             print(f"Error fetching students with answers: {e}")
             return []
-        finally:
-            conn.close()
+
+    def fetch_students_with_graded_counts(self, search_query: Optional[str] = None) -> List[Tuple]:
+        """Fetch (id, name, school, student_number, graded_count) of students with graded answers"""
+        search_sql, search_params = self._student_search_condition(search_query)
+        with self.connection() as conn:
+            # 채점된 답안 수는 idx_answers_student_created 만으로 집계 (테이블 접근 없음)
+            return conn.execute(f"""
+                SELECT s.id, s.name, s.school, s.student_number, g.graded_count
+                FROM (
+                    SELECT student_id, COUNT(*) AS graded_count
+                    FROM student_answers
+                    WHERE score IS NOT NULL
+                    GROUP BY student_id
+                ) g
+                JOIN students s ON s.id = g.student_id
+                WHERE {search_sql}
+                ORDER BY s.name, s.id
+            """, search_params).fetchall()
+
+    def fetch_student_passage_summaries(self, student_id: int) -> List[Tuple]:
+        """Fetch (passage_id, title, answer_count, average_score, last_answered_at) for passages a student answered"""
+        with self.connection() as conn:
+            return conn.execute("""
+                SELECT p.id, p.title, COUNT(*) AS answer_count,
+                       AVG(sa.score) AS average_score, MAX(sa.created_at) AS last_answered_at
+                FROM student_answers sa
+                JOIN questions q ON q.id = sa.question_id
+                JOIN passages p ON p.id = q.passage_id
+                WHERE sa.student_id = ?
+                GROUP BY p.id
+                ORDER BY p.title, p.id
+            """, (student_id,)).fetchall()
 
     def get_student_statistics(self, student_id: int) -> Dict[str, Any]:
         """Get statistics for a specific student"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Get student's average and total average
-        cursor.execute("""
-            SELECT 
-                AVG(sa.score) as student_avg,
-                (SELECT AVG(score) FROM student_answers) as total_avg
-            FROM student_answers sa
-            WHERE sa.student_id = ?
-        """, (student_id,))
-
-        avg_data = cursor.fetchone()
-
-        # Get student's score progression
-        cursor.execute("""
-            SELECT p.title, sa.score, sa.created_at
-            FROM student_answers sa
-            JOIN questions q ON sa.question_id = q.id
-            JOIN passages p ON q.passage_id = p.id
-            WHERE sa.student_id = ?
-            ORDER BY sa.created_at
-        """, (student_id,))
-
-        progression_data = cursor.fetchall()
-
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+
+            # Get student's average and total average
+            cursor.execute("""
+                SELECT 
+                    (SELECT CAST(score_sum AS REAL) / score_count FROM stats_student WHERE student_id = ?),
+                    (SELECT CAST(score_sum AS REAL) / score_count FROM stats_overall WHERE id = 1)
+            """, (student_id,))
+
+            avg_data = cursor.fetchone()
+
+            # Get student's score progression
+            cursor.execute("""
+                SELECT p.title, sa.score, sa.created_at
+                FROM student_answers sa
+                JOIN questions q ON sa.question_id = q.id
+                JOIN passages p ON q.passage_id = p.id
+                WHERE sa.student_id = ?
+                ORDER BY sa.created_at
+            """, (student_id,))
+
+            progression_data = cursor.fetchall()
+
         return {
             'student_average': avg_data[0] if avg_data else 0,
             'total_average': avg_data[1] if avg_data else 0,
@@ -387,22 +998,17 @@ class DatabaseManager:
 
     def get_passage_statistics(self, passage_id: int) -> List[Dict[str, Any]]:
         """Get statistics for a specific passage"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT 
-                q.question,
-                AVG(sa.score) as avg_score,
-                COUNT(sa.id) as attempt_count
-            FROM questions q
-            LEFT JOIN student_answers sa ON q.id = sa.question_id
-            WHERE q.passage_id = ?
-            GROUP BY q.id
-        """, (passage_id,))
-
-        stats = cursor.fetchall()
-        conn.close()
+        with self.connection() as conn:
+            stats = conn.execute("""
+                SELECT 
+                    q.question,
+                    CAST(sq.score_sum AS REAL) / sq.score_count as avg_score,
+                    COALESCE(sq.answer_count, 0) as attempt_count
+                FROM questions q
+                LEFT JOIN stats_question sq ON sq.question_id = q.id
+                WHERE q.passage_id = ?
+                ORDER BY q.id
+            """, (passage_id,)).fetchall()
 
         return [
             {
@@ -413,5 +1019,12 @@ class DatabaseManager:
             for stat in stats
         ]
 
-# Create a global instance
-db = DatabaseManager()
+
+def __getattr__(name: str) -> Any:
+    # 전역 인스턴스는 처음 쓰일 때 만든다 (벤치마크/테스트처럼 DatabaseManager 클래스만 쓰는 곳에서
+    # import 만으로 config.DB_PATH 의 DB 가 만들어지거나 마이그레이션되지 않도록)
+    if name == 'db':
+        global db
+        db = DatabaseManager()
+        return db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,73 @@
+"""Literable 데이터베이스 관리 명령
+
+    python Literable/db_tools.py migrate [--db Literable.db]
+    python Literable/db_tools.py rebuild-stats [--db Literable.db]
+    python Literable/db_tools.py --db scale.db seed --preset medium --seed 42
+"""
+import argparse
+import sqlite3
+import time
+import config
+from migrations import init_schema, schema_version
+from rollups import rebuild_rollups
+from synthetic_data import PRESETS, generate
+
+
+def migrate(args: argparse.Namespace) -> None:
+    conn = sqlite3.connect(args.db)
+    try:
+        applied = init_schema(conn)
+        print(f"schema version {schema_version(conn)} (applied: {applied or 'none'})")
+    finally:
+        conn.close()
+
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    conn = sqlite3.connect(args.db)
+    try:
+        init_schema(conn)
+        started = time.perf_counter()
+        with conn:
+            rebuild_rollups(conn)
+        print(f"statistics rollups rebuilt in {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.close()
+
+
+def seed(args: argparse.Namespace) -> None:
+    scale = PRESETS[args.preset]._replace(**{
+        field: getattr(args, field) for field in PRESETS[args.preset]._fields
+        if getattr(args, field) is not None
+    })
+    print(f"generating ~{scale.answers:,} answers ({scale})")
+    generate(args.db, scale, seed=args.seed, ungraded_rate=args.ungraded_rate)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Literable database maintenance")
+    parser.add_argument("--db", default=config.DB_PATH, help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("migrate", help="apply pending schema migrations").set_defaults(func=migrate)
+    commands.add_parser("rebuild-stats", help="recompute statistics rollup tables from answers") \
+        .set_defaults(func=rebuild_stats)
+
+    seed_parser = commands.add_parser("seed", help="fill an empty database with deterministic synthetic data")
+    seed_parser.add_argument("--preset", choices=sorted(PRESETS), default="tiny")
+    seed_parser.add_argument("--seed", type=int, default=42)
+    seed_parser.add_argument("--students", type=int)
+    seed_parser.add_argument("--passages", type=int)
+    seed_parser.add_argument("--questions-per-passage", dest="questions_per_passage", type=int)
+    seed_parser.add_argument("--passages-per-student", dest="passages_per_student", type=int)
+    seed_parser.add_argument("--ungraded-rate", dest="ungraded_rate", type=float, default=0.1)
+    seed_parser.set_defaults(func=seed)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
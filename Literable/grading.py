@@ -0,0 +1,662 @@
+import json
+import math
+import queue
+import re
+import sqlite3
+import threading
+import uuid
+import requests
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import config
+from answer_matching import AnswerMatcher
+from grading_cache import GradingCache, cache_key
+from grading_context import condense
+from llm_client import CircuitOpenError, UsageTally, llm, usage_summary
+from prompt_registry import prompt_version
+from rate_limit import estimate_tokens
+from token_budget import (PASSAGE_MAX_OUTPUT_TOKENS, RunEstimate, estimate_run, output_cap, prompt_tokens,
+                          truncate_tokens)
+
+# AI 채점 로직 (Streamlit 에 의존하지 않으므로 작업 스레드에서 호출 가능)
+
+
+# 채점 응답은 JSON 객체로 받는다 (현재 api-version 은 json_schema 가 아닌 json_object 만 지원하므로
+# 스키마는 프롬프트로 지시하고 파싱할 때 검증한다). 프롬프트 파일의 '점수:/첨삭:' 형식 지시는 아래 지시로 대체.
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+JSON_OUTPUT_INSTRUCTIONS = """
+# 출력 형식
+위에 적힌 출력 형식 대신 아래 JSON 객체 하나로만 출력하세요.
+{"score": 0~5 정수, "feedback": "첨삭 내용"}
+"""
+
+REASK_PROMPT = ('앞의 답변을 {"score": 0~5 정수, "feedback": "첨삭 내용"} 형식의 JSON 객체 하나로만 '
+                '다시 출력하세요. 채점 내용은 바꾸지 마세요.')
+
+MAX_SCORE = 5
+
+
+class GradingResult(NamedTuple):
+    score: int
+    feedback: str
+
+
+class ParseMetrics:
+    """채점 응답 파싱 결과 집계 - json (정상), legacy (예전 텍스트 형식), reasked (형식 재요청), failed"""
+
+    def __init__(self):
+        self._counts = {'json': 0, 'legacy': 0, 'reasked': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            self._counts[kind] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+parse_metrics = ParseMetrics()
+
+
+# 제공자 측 프롬프트 캐시는 앞부분이 바이트 단위로 같은 요청끼리만 적용된다.
+# 그래서 학생마다 같은 부분(평가 기준 → 지문 → 문제 → 모범답안)을 앞에, 달라지는 학생답안을 맨 끝에 둔다.
+
+def passage_context(data: Dict[str, Any]) -> str:
+    """프롬프트에 넣을 지문 - 문항별 압축 컨텍스트(grading_context)가 있으면 그것, 없으면 지문 전체"""
+    return (data.get('grading_context') or data.get('passage_text') or '').strip()
+
+
+def build_user_prompt(data: Dict[str, Any]) -> str:
+    """채점 요청 본문 (지문/문제/모범답안/학생답안 - 학생답안만 학생마다 다름)"""
+    passage = passage_context(data)
+    context = f"지문:\n{passage}\n\n" if passage else ""
+    return f"""{context}문제: {data['question_text']}
+모범답안: {data['model_answer']}
+학생답안: {data['student_answer']}
+"""
+
+
+def validate_result(score: Any, feedback: Any) -> GradingResult:
+    """점수(0~5 정수)와 첨삭(빈 문자열 아님) 검증 - 틀리면 ValueError"""
+    if isinstance(score, bool) or not isinstance(score, (int, float, str)):
+        raise ValueError(f"점수 형식 오류: {score!r}")
+    if isinstance(score, str):
+        # "3", "3.0" 은 숫자와 같게 처리하고 "3.5" 는 3.5 와 똑같이 범위 검사에서 거부
+        try:
+            score = float(score)
+        except ValueError:
+            raise ValueError(f"점수 형식 오류: {score!r}") from None
+    if not math.isfinite(score) or score != int(score):
+        raise ValueError(f"점수 형식 오류 (정수가 아님): {score!r}")
+    if not 0 <= score <= MAX_SCORE:
+        raise ValueError(f"점수 범위 오류: {score!r}")
+    if not isinstance(feedback, str) or not feedback.strip():
+        raise ValueError("첨삭 내용이 없습니다")
+    return GradingResult(int(score), feedback.strip())
+
+
+_LEGACY_SCORE = re.compile(r"점수\s*[:：]?\s*\[?\s*(\d+(?:\.\d+)?)")
+_LEGACY_FEEDBACK = re.compile(r"첨삭\s*[:：]\s*(.+)", re.DOTALL)
+
+
+def parse_grading_result(result: str) -> Tuple[int, str]:
+    """'점수: n' / '첨삭: ...' 형식의 (예전) 텍스트 응답에서 점수와 첨삭 추출"""
+    score = _LEGACY_SCORE.search(result)
+    feedback = _LEGACY_FEEDBACK.search(result)
+    if not score or not feedback:
+        raise ValueError("응답에서 점수/첨삭을 찾을 수 없습니다")
+    return validate_result(score.group(1), feedback.group(1))
+
+
+def parse_grading_output(result: str) -> Tuple[GradingResult, str]:
+    """JSON 객체 응답을 검증해 파싱하고, 아니면 예전 텍스트 형식으로 파싱. (결과, 'json'|'legacy') 반환"""
+    text = result.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        return validate_result(payload.get('score', payload.get('점수')),
+                               payload.get('feedback', payload.get('첨삭'))), 'json'
+    return GradingResult(*parse_grading_result(result)), 'legacy'
+
+
+_PARTIAL_SCORE = re.compile(r'"score"\s*:\s*"?(\d+)')
+_PARTIAL_FEEDBACK = re.compile(r'"feedback"\s*:\s*"((?:[^"\\]|\\.)*)', re.DOTALL)
+
+
+def partial_result(text: str) -> Tuple[Optional[int], str]:
+    """스트리밍 중인 (미완성) 응답에서 지금까지 나온 점수와 첨삭"""
+    # JSON 응답이면 "score" 가 나오기 전까지 점수 없음 (첨삭 속 '점수 3' 같은 문구를 점수로 읽지 않도록)
+    is_json = text.lstrip().startswith(('{', '```'))
+    score = _PARTIAL_SCORE.search(text) if is_json else _LEGACY_SCORE.search(text)
+    feedback = ""
+    match = _PARTIAL_FEEDBACK.search(text) if is_json else None
+    if match:
+        raw = match.group(1)
+        # 조각 경계에서 잘린 이스케이프(\, \uXXXX)는 다음 조각이 올 때까지 보류
+        for cut in range(0, min(6, len(raw)) + 1):
+            try:
+                feedback = json.loads('"' + raw[:len(raw) - cut] + '"')
+                break
+            except ValueError:
+                continue
+    elif not is_json:
+        legacy = _LEGACY_FEEDBACK.search(text)
+        feedback = legacy.group(1).strip() if legacy else ""
+    return (int(score.group(1)) if score else None), feedback
+
+
+def request_grading(system_prompt: str, user_prompt: str,
+                    on_update: Optional[Callable[[Optional[int], str], None]] = None,
+                    usage: Optional[UsageTally] = None, max_tokens: int = output_cap('')) -> GradingResult:
+    """JSON 형식으로 채점을 요청하고, 파싱에 실패하면 같은 대화에서 형식만 한 번 다시 요청.
+
+    on_update 가 있으면 스트리밍으로 받으며 조각이 올 때마다 on_update(점수 또는 None, 지금까지의 첨삭)를
+    호출한다. usage 가 있으면 요청별 입력 토큰 추정치와 실제 사용량을 더한다 (스트리밍 응답은 실제 사용량을 알 수 없음).
+    호출 실패 시 requests.exceptions.RequestException, 재요청 후에도 파싱 실패 시 ValueError 발생.
+    """
+    messages = [
+        {"role": "system", "content": system_prompt + "\n" + JSON_OUTPUT_INSTRUCTIONS},
+        {"role": "user", "content": user_prompt}
+    ]
+    input_tokens = prompt_tokens(*(message["content"] for message in messages))
+    if on_update is None:
+        response = llm.complete(messages, max_tokens=max_tokens, response_format=JSON_RESPONSE_FORMAT)
+        content = response.content
+        if usage is not None:
+            usage.add(usage_summary(response.usage), input_tokens)
+    else:
+        pieces: List[str] = []
+        for piece in llm.stream(messages, max_tokens=max_tokens, response_format=JSON_RESPONSE_FORMAT):
+            pieces.append(piece)
+            on_update(*partial_result("".join(pieces)))
+        content = "".join(pieces)
+        if usage is not None:
+            usage.add(None, input_tokens)
+    try:
+        result, kind = parse_grading_output(content)
+        parse_metrics.record(kind)
+        return result
+    except ValueError:
+        parse_metrics.record('reasked')
+
+    # 채점을 다시 시키지 않고 앞의 답변을 형식에 맞게 옮겨 적게 한다
+    messages = messages + [
+        {"role": "assistant", "content": content},
+        {"role": "user", "content": REASK_PROMPT}
+    ]
+    response = llm.complete(messages, max_tokens=max_tokens, response_format=JSON_RESPONSE_FORMAT)
+    if usage is not None:
+        usage.add(usage_summary(response.usage), prompt_tokens(*(message["content"] for message in messages)))
+    try:
+        return parse_grading_output(response.content)[0]
+    except ValueError:
+        parse_metrics.record('failed')
+        raise
+
+
+def fit_to_budget(system_prompt: str, data: Dict[str, Any],
+                  max_input_tokens: int = config.LLM_MAX_INPUT_TOKENS, log: bool = True) -> Dict[str, Any]:
+    """입력 토큰 추정치가 상한을 넘으면 줄인 data 사본 (넘지 않으면 data 그대로).
+
+    지문을 압축 컨텍스트로 바꾸고, 그래도 넘으면 지문, 그다음 학생답안의 뒷부분을 잘라낸다.
+    같은 입력이면 항상 같은 결과가 나온다. log=False 면 (예상치 계산처럼 실제 요청이 아닐 때) 기록하지 않는다.
+    """
+    system = system_prompt + "\n" + JSON_OUTPUT_INSTRUCTIONS
+
+    def excess(candidate: Dict[str, Any]) -> int:
+        return prompt_tokens(system, build_user_prompt(candidate)) - max_input_tokens
+
+    over = excess(data)
+    if over <= 0:
+        return data
+    original = over
+    data = dict(data)
+    if not data.get('grading_context') and data.get('passage_text'):
+        data['grading_context'] = condense(data['passage_text'], data['question_text'], data['model_answer'])
+        over = excess(data)
+    if over > 0:
+        context = passage_context(data)
+        data['grading_context'] = data['passage_text'] = \
+            truncate_tokens(context, max(0, estimate_tokens(context) - over))
+        over = excess(data)
+    if over > 0:
+        data['student_answer'] = truncate_tokens(data['student_answer'],
+                                                 max(0, estimate_tokens(data['student_answer']) - over))
+    if log:
+        print(f"[Literable] question {data['question_id']}: input trimmed by ~{original} tokens "
+              f"to fit LLM_MAX_INPUT_TOKENS={max_input_tokens}")
+    return data
+
+
+def _result(data: Dict[str, Any], score: int, feedback: str, source: str,
+            similarity: Optional[float] = None, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'question_id': data['question_id'],
+        'score': score,
+        'feedback': feedback,
+        'source': source,
+        'similarity': similarity,
+        # 다른 학생 답안의 결과를 가져온 경우(match)는 어떤 프롬프트로 채점됐는지 알 수 없다
+        'prompt_version': prompt_version(system_prompt) if system_prompt else None
+    }
+
+
+def reuse_previous(system_prompt: str, data: Dict[str, Any], cache: Optional[GradingCache] = None,
+                   matcher: Optional[AnswerMatcher] = None) -> Optional[Dict[str, Any]]:
+    """다른 학생의 유사 답안(matcher) 또는 같은 입력의 이전 결과(cache)가 있으면 그 결과"""
+    if matcher is not None:
+        match = matcher.find(data)
+        if match:
+            return _result(data, match['score'], match['feedback'], 'match', match['similarity'])
+    if cache is not None:
+        cached = cache.get(cache_key(system_prompt, data['question_text'], data['model_answer'],
+                                     data['student_answer'], llm.endpoint, passage_context(data)))
+        if cached:
+            if matcher is not None:
+                matcher.add(data, *cached)
+            return _result(data, cached[0], cached[1], 'cache', system_prompt=system_prompt)
+    return None
+
+
+def remember_result(system_prompt: str, data: Dict[str, Any], score: int, feedback: str,
+                    cache: Optional[GradingCache] = None, matcher: Optional[AnswerMatcher] = None) -> None:
+    """새로 채점한 결과를 캐시와 유사 답안 검색 대상에 추가"""
+    if cache is not None:
+        cache.put(cache_key(system_prompt, data['question_text'], data['model_answer'],
+                            data['student_answer'], llm.endpoint, passage_context(data)), score, feedback)
+    if matcher is not None:
+        matcher.add(data, score, feedback)
+
+
+def grade_answer(system_prompt: str, data: Dict[str, Any], cache: Optional[GradingCache] = None,
+                 matcher: Optional[AnswerMatcher] = None,
+                 on_update: Optional[Callable[[Optional[int], str], None]] = None,
+                 usage: Optional[UsageTally] = None) -> Dict[str, Any]:
+    """문제 하나 채점 - 실패 시 예외 발생.
+
+    matcher 가 있으면 다른 학생의 유사 답안 결과를, cache 가 있으면 같은 입력의 이전 결과나
+    다른 스레드에서 진행 중인 같은 입력의 채점 결과를 재사용한다. 결과의 'source' 는 'match', 'cache', 'llm' 중 하나. on_update/usage 는 request_grading 참고.
+    """
+    previous = reuse_previous(system_prompt, data, cache, matcher)
+    if previous:
+        return previous
+
+    key = None
+    if cache is not None:
+        key = cache_key(system_prompt, data['question_text'], data['model_answer'], data['student_answer'],
+                        llm.endpoint, passage_context(data))
+        inflight = cache.begin(key)
+        if inflight is not None:
+            # 다른 스레드가 같은 입력을 채점 중이면 그 결과를 쓴다 (실패했으면 직접 채점)
+            key = None
+            shared = cache.wait_shared(inflight)
+            if shared:
+                if matcher is not None:
+                    matcher.add(data, *shared)
+                return _result(data, shared[0], shared[1], 'cache', system_prompt=system_prompt)
+
+    # 캐시/유사 답안 저장은 원래 입력 기준 (잘라내기는 결정적이므로 같은 입력이면 같은 요청)
+    try:
+        score, feedback = request_grading(system_prompt, build_user_prompt(fit_to_budget(system_prompt, data)),
+                                          on_update, usage, output_cap(data.get('category')))
+        remember_result(system_prompt, data, score, feedback, cache, matcher)
+    except BaseException:
+        if key:
+            cache.finish(key, None)
+        raise
+    if key:
+        cache.finish(key, (score, feedback))
+    return _result(data, score, feedback, 'llm', system_prompt=system_prompt)
+
+
+GRADING_ERRORS = (requests.exceptions.RequestException, IndexError, ValueError, KeyError)
+
+
+def failure_message(error: Exception) -> str:
+    """채점 실패 사유를 사용자에게 보여줄 문장으로 변환"""
+    if isinstance(error, requests.exceptions.RequestException):
+        return f"LLM 호출 실패: {error}"
+    if isinstance(error, GRADING_ERRORS + (TypeError,)):
+        return f"결과 파싱 중 오류가 발생했습니다: {error}"
+    return f"채점 중 오류가 발생했습니다 ({type(error).__name__}): {error}"
+
+
+# 스트리밍 중 화면 갱신 주기 (초) - 조각마다 갱신하지 않고 이 간격으로 최신 내용만 반영
+STREAM_UPDATE_INTERVAL = 0.1
+
+
+def grade_answers(tasks: List[Tuple[str, Dict[str, Any]]],
+                  max_workers: int = config.LLM_MAX_CONCURRENCY,
+                  on_progress: Optional[Callable[[int, int], None]] = None,
+                  cache: Optional[GradingCache] = None,
+                  matcher: Optional[AnswerMatcher] = None,
+                  on_update: Optional[Callable[[Dict[str, Any], Optional[int], str], None]] = None,
+                  usage: Optional[UsageTally] = None
+                  ) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+    """(system_prompt, data) 목록을 동시에 채점.
+
+    결과는 tasks 순서대로 반환하며, 실패한 문제는 나머지를 중단하지 않고
+    (data, 오류 메시지) 로 따로 모은다. on_progress(완료 수, 전체 수)는 호출한
+    스레드에서 실행되므로 Streamlit 위젯을 갱신해도 된다.
+    on_update 가 있으면 응답을 스트리밍으로 받아 on_update(data, 점수 또는 None, 지금까지의 첨삭)를
+    역시 호출한 스레드에서 호출한다.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    failures: Dict[int, Tuple[Dict[str, Any], str]] = {}
+    if not tasks:
+        return [], []
+
+    # 작업 스레드는 스트리밍 조각을 큐에 넣기만 하고, 화면 갱신은 이 스레드에서 한다
+    updates: "queue.Queue[Tuple[int, Optional[int], str]]" = queue.Queue()
+
+    def grade(index: int, system_prompt: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        def stream_update(score: Optional[int], feedback: str) -> None:
+            updates.put((index, score, feedback))
+        return grade_answer(system_prompt, data, cache, matcher, stream_update if on_update else None, usage)
+
+    def flush_updates() -> None:
+        latest: Dict[int, Tuple[Optional[int], str]] = {}
+        while not updates.empty():
+            index, score, feedback = updates.get_nowait()
+            latest[index] = (score, feedback)
+        for index, (score, feedback) in latest.items():
+            on_update(tasks[index][1], score, feedback)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        futures = {
+            executor.submit(grade, index, system_prompt, data): index
+            for index, (system_prompt, data) in enumerate(tasks)
+        }
+        pending = set(futures)
+        done = 0
+        while pending:
+            finished, pending = wait(pending, timeout=STREAM_UPDATE_INTERVAL if on_update else None,
+                                     return_when=FIRST_COMPLETED)
+            if on_update:
+                flush_updates()
+            for future in finished:
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    # 캐시/유사 답안 조회의 DB 오류나 content 가 null 인 응답 등 어떤 오류든 그 문제의 실패로 처리
+                    failures[index] = (tasks[index][1], failure_message(e))
+                done += 1
+                if on_progress:
+                    on_progress(done, len(tasks))
+
+    return ([results[i] for i in sorted(results)],
+            [failures[i] for i in sorted(failures)])
+
+
+PASSAGE_OUTPUT_INSTRUCTIONS = """
+# 출력 형식
+위 평가 기준에 적힌 출력 형식 대신, 모든 문항의 결과를 아래와 같은 JSON 객체 하나로만 출력하세요.
+각 문항은 해당 유형의 평가 기준으로 채점하세요.
+{"results": [{"question_id": 문항 번호, "score": 0~5 정수, "feedback": "첨삭 내용"}]}
+"""
+
+
+def build_passage_prompts(tasks: List[Tuple[str, Dict[str, Any]]]) -> Tuple[str, str]:
+    """한 학생의 지문 전체 답안을 한 번에 채점하기 위한 (시스템 프롬프트, 사용자 프롬프트).
+
+    평가 기준은 문제 유형별로 한 번씩만 넣는다.
+    """
+    rubrics: Dict[str, str] = {}
+    for system_prompt, data in tasks:
+        rubrics.setdefault(data.get('category') or '기본', system_prompt)
+    system_prompt = "\n\n".join(
+        f"# 평가 기준: {category}\n{rubric.strip()}" for category, rubric in rubrics.items()
+    ) + "\n" + PASSAGE_OUTPUT_INSTRUCTIONS
+
+    # 지문과 문항(문제/모범답안)을 먼저, 학생답안은 모두 끝에 모아 학생 간 공통 앞부분을 최대화
+    passage = next((data.get('passage_text') for _, data in tasks if data.get('passage_text')), '')
+    # 문항별 압축 컨텍스트를 모두 합쳐도 지문보다 짧을 때만 지문 대신 문항마다 넣는다
+    contexts = [data.get('grading_context') for _, data in tasks]
+    if all(contexts) and sum(len(context) for context in contexts) < len(passage):
+        passage = ''
+
+    def question_block(data: Dict[str, Any]) -> str:
+        excerpt = "" if passage else passage_context(data)
+        excerpt = f"지문 발췌:\n{excerpt}\n" if excerpt else ""
+        return f"""
+## question_id: {data['question_id']} (유형: {data.get('category') or '기본'})
+{excerpt}문제: {data['question_text']}
+모범답안: {data['model_answer']}
+"""
+
+    questions = "\n".join(question_block(data) for _, data in tasks)
+    answers = "\n".join(f"## question_id: {data['question_id']}\n학생답안: {data['student_answer']}"
+                         for _, data in tasks)
+    context = f"# 지문\n{passage.strip()}\n\n" if passage else ""
+    user_prompt = f"{context}# 문항{questions}\n# 학생답안\n{answers}\n"
+    return system_prompt, user_prompt
+
+
+def passage_output_cap(tasks: List[Tuple[str, Dict[str, Any]]]) -> int:
+    return min(PASSAGE_MAX_OUTPUT_TOKENS, sum(output_cap(data.get('category')) for _, data in tasks))
+
+
+def parse_passage_result(result: str, question_ids: List[int]) -> Dict[int, Tuple[int, str]]:
+    """{"results": [...]} (또는 배열) 응답에서 유효한 문항 결과만 {question_id: (점수, 첨삭)} 로 추출"""
+    if not isinstance(result, str):
+        # 콘텐츠 필터 등으로 content 가 null 인 응답
+        parse_metrics.record('failed')
+        return {}
+    try:
+        payload = json.loads(result)
+    except ValueError:
+        # 설명이나 코드 블록이 섞인 경우 배열 부분만 시도
+        start, end = result.find('['), result.rfind(']')
+        try:
+            payload = json.loads(result[start:end + 1]) if 0 <= start < end else None
+        except ValueError:
+            payload = None
+    entries = payload.get('results') if isinstance(payload, dict) else payload
+
+    expected = set(question_ids)
+    parsed: Dict[int, Tuple[int, str]] = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            question_id = int(entry['question_id'])
+            graded = validate_result(entry.get('score'), entry.get('feedback'))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if question_id in expected:
+            parsed.setdefault(question_id, tuple(graded))
+    parse_metrics.record('json' if parsed else 'failed')
+    return parsed
+
+
+def grade_passage(tasks: List[Tuple[str, Dict[str, Any]]],
+                  max_workers: int = config.LLM_MAX_CONCURRENCY,
+                  on_progress: Optional[Callable[[int, int], None]] = None,
+                  cache: Optional[GradingCache] = None,
+                  matcher: Optional[AnswerMatcher] = None,
+                  usage: Optional[UsageTally] = None
+                  ) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]]]:
+    """한 학생의 지문 답안 (system_prompt, data) 목록을 요청 한 번으로 채점 (반환 형식은 grade_answers 와 같음).
+
+    재사용할 수 있는 결과는 먼저 채우고, 응답에 빠졌거나 형식이 틀린 문항과
+    요청 자체가 실패한 경우는 문항별 채점(grade_answers)으로 다시 처리한다.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    pending: List[int] = []
+    for index, (system_prompt, data) in enumerate(tasks):
+        previous = reuse_previous(system_prompt, data, cache, matcher)
+        if previous:
+            results[index] = previous
+        else:
+            pending.append(index)
+
+    if len(pending) > 1:
+        passage_tasks = [tasks[index] for index in pending]
+        system_prompt, user_prompt = build_passage_prompts(passage_tasks)
+        input_tokens = prompt_tokens(system_prompt, user_prompt)
+        graded: Dict[int, Tuple[int, str]] = {}
+        # 입력이 상한을 넘으면 문항별 채점으로 (문항별 요청은 각자 상한에 맞게 줄임)
+        if input_tokens > config.LLM_MAX_INPUT_TOKENS:
+            print(f"[Literable] passage prompt (~{input_tokens} tokens) exceeds LLM_MAX_INPUT_TOKENS, "
+                  f"grading per question")
+        else:
+            try:
+                response = llm.complete([
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ], max_tokens=passage_output_cap(passage_tasks), response_format=JSON_RESPONSE_FORMAT)
+                if usage is not None:
+                    usage.add(usage_summary(response.usage), input_tokens)
+                graded = parse_passage_result(response.content,
+                                              [data['question_id'] for _, data in passage_tasks])
+            except GRADING_ERRORS + (TypeError,) as e:
+                # 호출 실패나 choices/content 가 없는 응답도 문항별 채점으로 넘긴다
+                print(f"[Literable] passage grading request failed, grading per question: {e}")
+        for index in pending:
+            system_prompt, data = tasks[index]
+            if data['question_id'] in graded:
+                score, feedback = graded[data['question_id']]
+                remember_result(system_prompt, data, score, feedback, cache, matcher)
+                results[index] = _result(data, score, feedback, 'llm', system_prompt=system_prompt)
+        pending = [index for index in pending if index not in results]
+
+    if on_progress:
+        on_progress(len(results), len(tasks))
+
+    failures: List[Tuple[Dict[str, Any], str]] = []
+    if pending:
+        def fallback_progress(done: int, total: int) -> None:
+            if on_progress:
+                on_progress(len(tasks) - total + done, len(tasks))
+
+        fallback_results, failures = grade_answers([tasks[index] for index in pending], max_workers,
+                                                   fallback_progress, cache, matcher, usage=usage)
+        by_question = {result['question_id']: result for result in fallback_results}
+        for index in pending:
+            if tasks[index][1]['question_id'] in by_question:
+                results[index] = by_question[tasks[index][1]['question_id']]
+
+    return [results[i] for i in sorted(results)], failures
+
+
+def plan_requests(tasks: List[Tuple[str, Dict[str, Any]]], at_once: bool = False) -> List[Tuple[int, int]]:
+    """채점 요청별 (입력 토큰 추정치, 출력 상한) - at_once 면 tasks 전체가 요청 하나 (grade_passage)"""
+    if at_once and len(tasks) > 1:
+        system_prompt, user_prompt = build_passage_prompts(tasks)
+        input_tokens = prompt_tokens(system_prompt, user_prompt)
+        if input_tokens <= config.LLM_MAX_INPUT_TOKENS:
+            return [(input_tokens, passage_output_cap(tasks))]
+    return [
+        (prompt_tokens(system_prompt + "\n" + JSON_OUTPUT_INSTRUCTIONS,
+                       build_user_prompt(fit_to_budget(system_prompt, data, log=False))),
+         output_cap(data.get('category')))
+        for system_prompt, data in tasks
+    ]
+
+
+def estimate_grading(tasks: List[Tuple[str, Dict[str, Any]]], concurrency: int,
+                     at_once: bool = False) -> RunEstimate:
+    """채점 실행 전 토큰/비용/소요 시간 예상치 (token_budget.estimate_run 참고)"""
+    return estimate_run(plan_requests(tasks, at_once), 1 if at_once else concurrency)
+
+
+def attach_grading_contexts(db: Any, items: List[Dict[str, Any]]) -> None:
+    """채점 항목에 문항별 압축 컨텍스트(grading_context)를 채움 (GRADING_CONTEXT 가 꺼져 있으면 그대로)"""
+    if items and config.GRADING_CONTEXT:
+        contexts = db.refresh_grading_contexts({item['question_id'] for item in items})
+        for item in items:
+            item['grading_context'] = contexts.get(item['question_id'])
+
+
+def run_grading_job(db: Any, job_id: int, system_prompts: Dict[str, str],
+                    max_workers: int = config.LLM_BATCH_CONCURRENCY,
+                    max_attempts: int = config.LLM_BATCH_MAX_ATTEMPTS,
+                    on_progress: Optional[Callable[[Dict[str, Any], Optional[str]], None]] = None,
+                    cache: Optional[GradingCache] = None,
+                    matcher: Optional[AnswerMatcher] = None,
+                    usage: Optional[UsageTally] = None
+                    ) -> Dict[str, int]:
+    """일괄 채점 작업의 남은 항목을 동시에 채점하고 결과가 나오는 대로 저장.
+
+    db 는 DatabaseManager, system_prompts 는 카테고리별 시스템 프롬프트 ('' 는 기본 프롬프트).
+    항목은 빈 작업 스레드 수만큼만 가져오고(임대), 저장은 작업 스레드가 채점 직후 직접 하므로
+    호출한 스크립트가 중단(Streamlit 재실행/중지)되어도 진행 중이던 답안의 결과는 남고 대기 중인 호출은
+    취소된다. 다시 실행하면 남은 항목만 채점한다.
+    on_progress(item, 오류 메시지 또는 None)는 호출한 스레드에서 실행된다.
+    LLM 엔드포인트의 회로 차단기가 열리면 남은 항목을 가져오지 않고 끝내며, 결과의 'deferred' 가
+    대기 상태로 돌려준 항목 수다 (재시도 횟수는 쓰지 않음).
+    항목은 문항 순으로 처리되어 연속된 요청이 같은 앞부분(평가 기준/지문/문항)을 공유하며,
+    usage 가 있으면 요청별 토큰 사용량(캐시된 프롬프트 토큰 포함)을 더한다.
+    """
+    run_token = uuid.uuid4().hex
+    max_workers = max(1, max_workers)
+    # 회로 차단기가 열리면(엔드포인트 장애) 새 항목을 가져오지 않고, 보내지 못한 항목은 대기 상태로 돌려준다
+    endpoint_down = threading.Event()
+    deferred: List[int] = []
+
+    def give_back(item: Dict[str, Any]) -> None:
+        try:
+            if db.release_grading_job_item(item['item_id'], run_token):
+                deferred.append(item['item_id'])
+        except sqlite3.Error as e:
+            # 돌려주지 못한 항목은 임대가 만료되면 다음 실행이 다시 가져간다
+            print(f"Error releasing grading job item: {e}")
+
+    def grade_item(item: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        try:
+            result = grade_answer(system_prompts.get(item['category'], system_prompts['']), item,
+                                  cache, matcher, None, usage)
+            if db.complete_grading_job_item(item['item_id'], item['student_id'], item['question_id'],
+                                            item['student_answer'], result['score'], result['feedback'],
+                                            result['prompt_version'], run_token):
+                return item, None
+            error = "채점 결과를 저장하지 못했습니다."
+        except CircuitOpenError:
+            endpoint_down.set()
+            give_back(item)
+            return None
+        except Exception as e:
+            # 한 답안의 오류가 나머지 채점을 멈추지 않도록 모든 오류를 그 답안의 실패로 기록
+            error = failure_message(e)
+        try:
+            db.fail_grading_job_item(item['item_id'], error, True, run_token)
+        except sqlite3.Error as e:
+            # 기록하지 못한 항목은 임대가 만료되면 다음 실행이 다시 가져간다
+            print(f"Error recording grading failure: {e}")
+        return item, error
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        running: Dict[Future, Dict[str, Any]] = {}
+        while True:
+            if endpoint_down.is_set():
+                for future in [future for future in running if future.cancel()]:
+                    give_back(running.pop(future))
+            elif len(running) < max_workers:
+                items = db.claim_grading_job_items(job_id, max_attempts, run_token, max_workers - len(running))
+                attach_grading_contexts(db, items)
+                running.update((executor.submit(grade_item, item), item) for item in items)
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del running[future]
+                outcome = future.result()
+                if outcome and on_progress:
+                    on_progress(*outcome)
+    finally:
+        # 중단된 경우 아직 시작하지 않은 호출은 취소 (진행 중인 호출은 끝나는 대로 스스로 저장)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    progress = db.get_grading_job_progress(job_id, max_attempts)
+    # 엔드포인트를 쓸 수 없어 보내지 못하고 대기 상태로 돌려준 항목 수 (0 이 아니면 나중에 이어서 실행)
+    progress['deferred'] = len(deferred)
+    return progress
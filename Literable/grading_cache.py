@@ -0,0 +1,121 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+import config
+
+# 채점 결과 캐시 (내용 주소 방식).
+# 프롬프트, 지문, 문제, 모범답안, 정규화한 학생답안, 모델이 모두 같으면 같은 키가 되므로
+# Streamlit 재실행이나 재채점 시 LLM 을 다시 호출하지 않고 저장된 결과를 돌려준다.
+# 같은 키를 이미 채점 중이면(동시에 도는 작업 스레드/일괄 채점 실행) 새로 호출하지 않고 그 결과를 기다린다.
+
+# 키 구성 방식을 바꾸면 올려서 이전 항목이 더 이상 맞지 않게 한다 (2: 지문 포함)
+CACHE_KEY_VERSION = 2
+
+EVICT_EVERY_PUTS = 500
+
+
+def normalize_answer(answer: str) -> str:
+    """공백/유니코드 표현 차이만 있는 답안이 같은 키가 되도록 정규화"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", answer or "")).strip()
+
+
+def cache_key(system_prompt: str, question: str, model_answer: str, student_answer: str, model: str,
+              passage: str = "") -> str:
+    """채점 입력 전체의 sha256"""
+    payload = json.dumps(
+        [CACHE_KEY_VERSION, model, system_prompt, passage, question, model_answer,
+         normalize_answer(student_answer)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GradingCache:
+    """SQLite 에 저장되는 채점 결과 캐시 (작업 스레드에서 호출 가능)"""
+
+    def __init__(self, db: Any, max_entries: int = config.GRADING_CACHE_MAX_ENTRIES,
+                 max_age_days: int = config.GRADING_CACHE_MAX_AGE_DAYS):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        # 진행 중인 같은 키의 채점 결과를 받아 쓴 횟수
+        self.shared = 0
+        self._puts = 0
+        self._inflight: Dict[str, "Future[Optional[Tuple[int, str]]]"] = {}
+        self._lock = threading.Lock()
+        self.evict()
+
+    # 캐시 오류로 채점이 실패하지 않도록 DB 오류는 캐시 미스로 처리한다
+    def get(self, key: str) -> Optional[Tuple[int, str]]:
+        try:
+            row = self.db.get_cached_grading(key, time.time())
+        except sqlite3.Error as e:
+            print(f"Error reading grading cache: {e}")
+            row = None
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row
+
+    def put(self, key: str, score: int, feedback: str) -> None:
+        try:
+            self.db.put_cached_grading(key, score, feedback, time.time())
+        except sqlite3.Error as e:
+            print(f"Error writing grading cache: {e}")
+            return
+        with self._lock:
+            self._puts += 1
+            evict = self._puts % EVICT_EVERY_PUTS == 0
+        if evict:
+            self.evict()
+
+    def begin(self, key: str) -> Optional["Future[Optional[Tuple[int, str]]]"]:
+        """같은 키를 채점 중인 호출이 있으면 그 결과의 Future, 없으면 None (호출한 쪽이 채점하고 finish 해야 함)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                self._inflight[key] = Future()
+            return future
+
+    def finish(self, key: str, result: Optional[Tuple[int, str]]) -> None:
+        """begin 으로 맡은 채점을 끝내고 기다리는 호출에 (score, feedback) 또는 실패(None)를 전달"""
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_result(result)
+
+    def wait_shared(self, future: "Future[Optional[Tuple[int, str]]]") -> Optional[Tuple[int, str]]:
+        """begin 이 돌려준 진행 중인 채점의 결과 (그 채점이 실패했으면 None)"""
+        result = future.result()
+        if result is not None:
+            with self._lock:
+                self.shared += 1
+        return result
+
+    def evict(self) -> int:
+        """보관 기간이 지났거나 최대 항목 수를 넘는 오래된 항목 삭제"""
+        if self.max_entries < 1:
+            return 0
+        return self.db.evict_grading_cache(self.max_entries, time.time() - self.max_age_days * 86400)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'shared': self.shared,
+            'entries': self.db.count_cached_gradings(),
+        }
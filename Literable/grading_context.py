@@ -0,0 +1,71 @@
+import hashlib
+import json
+import math
+import re
+from typing import List, Set, Tuple
+import config
+
+# 문항별 압축 채점 컨텍스트.
+# 긴 지문 전체 대신 지문의 핵심 문장과 문제/모범답안과 겹치는 근거 문장만 뽑아 채점 프롬프트에 넣는다
+# (모범답안은 프롬프트에 그대로 들어가므로 다시 넣지 않음). LLM 없이 글자 bigram 겹침으로 고르는
+# 추출식이라 같은 입력이면 항상 같은 결과가 나오며(프롬프트 캐시/채점 캐시 키가 흔들리지 않음),
+# 문항 저장 시 한 번 계산해 DB 에 보관한다.
+# 원문이 바뀌면 트리거가 지우고, 알고리즘이 바뀌면 CONTEXT_VERSION 으로 source_hash 가 달라져 다시 계산된다.
+
+CONTEXT_VERSION = 1
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+|\n+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def source_hash(passage: str, question: str, model_answer: str) -> str:
+    """압축 컨텍스트를 만든 원문(지문/문제/모범답안)과 알고리즘 버전의 sha256"""
+    payload = json.dumps([CONTEXT_VERSION, passage or "", question or "", model_answer or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text or "") if sentence.strip()]
+
+
+def _bigrams(text: str) -> Set[str]:
+    """공백/문장부호를 뺀 글자 bigram (조사가 붙는 한국어에서도 어근 겹침을 잡음)"""
+    text = _NON_WORD.sub("", text.lower())
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _overlap(sentence: Set[str], query: Set[str]) -> float:
+    # 긴 문장이 유리하지 않도록 문장 길이의 제곱근으로 나눈다
+    return len(sentence & query) / math.sqrt(len(sentence)) if sentence else 0.0
+
+
+def _top(scores: List[Tuple[float, int]], count: int) -> List[int]:
+    """점수가 높은 순(동점이면 앞 문장)으로 count 개를 골라 지문 순서로 반환"""
+    ranked = sorted((item for item in scores if item[0] > 0), key=lambda item: (-item[0], item[1]))
+    return sorted(index for _, index in ranked[:count])
+
+
+def condense(passage: str, question: str, model_answer: str,
+             evidence_count: int = config.GRADING_CONTEXT_EVIDENCE,
+             key_fact_count: int = config.GRADING_CONTEXT_KEY_FACTS) -> str:
+    """문항 채점에 필요한 부분만 남긴 지문 요약 (지문이 충분히 짧으면 원문 그대로)"""
+    sentences = split_sentences(passage)
+    if len(sentences) <= evidence_count + key_fact_count:
+        return (passage or "").strip()
+
+    grams = [_bigrams(sentence) for sentence in sentences]
+    query = _bigrams(question) | _bigrams(model_answer)
+    evidence = _top([(_overlap(g, query), i) for i, g in enumerate(grams)], evidence_count)
+
+    # 핵심 문장: 다른 문장들과 가장 많이 겹치는 (지문 전체 내용을 대표하는) 문장
+    centrality = [
+        (sum(len(g & other) for j, other in enumerate(grams) if j != i) / math.sqrt(len(g)) if g else 0.0, i)
+        for i, g in enumerate(grams) if i not in evidence
+    ]
+    key_facts = _top(centrality, key_fact_count)
+
+    lines = ["[지문 핵심 문장]"]
+    lines += [f"- ({i + 1}) {sentences[i]}" for i in key_facts]
+    lines.append("[문제 관련 근거 문장]")
+    lines += [f"- ({i + 1}) {sentences[i]}" for i in evidence] or ["- 없음"]
+    return "\n".join(lines)
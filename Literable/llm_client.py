@@ -0,0 +1,333 @@
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from tenacity import RetryCallState, Retrying, retry_if_exception, stop_after_attempt, stop_after_delay
+import config
+from rate_limit import RateLimiter, estimate_request_tokens
+
+# Azure OpenAI 호출 클라이언트.
+# 429/5xx/네트워크 오류는 지수 백오프(지터 포함)로 재시도하고 Retry-After 헤더를 따른다.
+# 요청마다 시도별 타임아웃과 전체 마감 시간이 있으며, 엔드포인트가 계속 실패하면
+# 회로 차단기가 열려 잠시 동안 호출 없이 바로 실패한다.
+
+# GPT-4o API 설정
+FN_CALL_KEY = "5acf6c1d1aed44eaa670dd059c8c84ce"
+FN_CALL_ENDPOINT = "https://apscus-prd-aabc2-openai.openai.azure.com/openai/deployments/gpt-4o/chat/completions?api-version=2024-02-15-preview"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """회로 차단기가 열려 있어 호출하지 않음"""
+
+
+class LLMResponse(NamedTuple):
+    content: str
+    usage: Dict[str, Any]
+
+
+def usage_summary(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """응답 usage 에서 프롬프트/캐시된 프롬프트/출력 토큰 수만 추림"""
+    usage = usage or {}
+    return {
+        'prompt_tokens': usage.get('prompt_tokens') or 0,
+        'cached_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0,
+        'completion_tokens': usage.get('completion_tokens') or 0,
+    }
+
+
+class UsageTally:
+    """여러 요청의 토큰 사용량 합계 (스레드 안전). usage 를 알 수 없는 요청(스트리밍)은 따로 센다"""
+
+    def __init__(self):
+        self.requests = 0
+        self.unreported = 0
+        # 요청 전에 로컬에서 추정한 입력 토큰 (token_budget.prompt_tokens)
+        self.estimated_prompt_tokens = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage: Optional[Dict[str, int]], estimated_prompt_tokens: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.estimated_prompt_tokens += estimated_prompt_tokens
+            if not usage:
+                self.unreported += 1
+                return
+            self.prompt_tokens += usage.get('prompt_tokens', 0)
+            self.cached_tokens += usage.get('cached_tokens', 0)
+            self.completion_tokens += usage.get('completion_tokens', 0)
+
+    @property
+    def cached_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+class CircuitBreaker:
+    """연속 실패가 threshold 회 이상이면 reset_timeout 초 동안 호출을 막는다 (이후 한 번 시험 호출)"""
+
+    def __init__(self, threshold: int = config.LLM_BREAKER_THRESHOLD,
+                 reset_timeout: float = config.LLM_BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self._opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(f"LLM 엔드포인트 연속 실패로 호출을 잠시 중단했습니다 "
+                                       f"({max(remaining, 0):.0f}초 후 재시도)")
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def retry_after_seconds(response: Optional[requests.Response]) -> Optional[float]:
+    """retry-after-ms / Retry-After (초 또는 HTTP 날짜) 헤더 값"""
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('Retry-After')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _httpx_errors(call: Callable[[], Any]) -> Any:
+    """httpx 예외를 재시도 로직이 아는 requests 예외로 변환"""
+    import httpx
+    try:
+        return call()
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+def _as_requests_response(reply: Any, response: Optional[requests.Response] = None) -> requests.Response:
+    response = response if response is not None else requests.Response()
+    response.status_code = reply.status_code
+    response.reason = reply.reason_phrase
+    response.headers = CaseInsensitiveDict(reply.headers)
+    response.url = str(reply.url)
+    return response
+
+
+class _HttpxStreamResponse(requests.Response):
+    """스트리밍 중인 httpx 응답을 requests.Response 처럼 줄 단위로 읽기"""
+
+    def __init__(self, reply: Any):
+        super().__init__()
+        self._reply = reply
+        _as_requests_response(reply, self)
+
+    def iter_lines(self, *args: Any, **kwargs: Any) -> Iterator[bytes]:
+        lines = self._reply.iter_lines()
+        while True:
+            line = _httpx_errors(lambda: next(lines, None))
+            if line is None:
+                return
+            yield line.encode('utf-8')
+
+    def close(self) -> None:
+        self._reply.close()
+
+
+class _HttpxSession:
+    """httpx.Client 를 requests.Session.post 처럼 쓰기 위한 어댑터 (응답/예외를 requests 형식으로 변환)"""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def post(self, url: str, headers: Dict[str, str], json: Dict[str, Any], timeout: float,
+             stream: bool = False) -> requests.Response:
+        if stream:
+            request = self.client.build_request("POST", url, headers=headers, json=json, timeout=timeout)
+            return _HttpxStreamResponse(_httpx_errors(lambda: self.client.send(request, stream=True)))
+        reply = _httpx_errors(lambda: self.client.post(url, headers=headers, json=json, timeout=timeout))
+        response = _as_requests_response(reply)
+        response._content = reply.content
+        return response
+
+
+def create_http_session(pool_size: int = config.LLM_HTTP_POOL_SIZE, http2: bool = config.LLM_HTTP2) -> Any:
+    """호출마다 TCP/TLS 연결을 새로 맺지 않도록 keep-alive 연결 풀을 가진 세션 생성.
+
+    http2 이면 httpx 의 HTTP/2 클라이언트를 쓰고, httpx 나 h2 가 없으면 requests 로 대신한다.
+    """
+    if http2:
+        try:
+            import httpx
+            return _HttpxSession(httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            ))
+        except ImportError as e:
+            print(f"[Literable] HTTP/2 unavailable ({e}); using requests keep-alive pool")
+
+    session = requests.Session()
+    # 동시 채점 스레드 수만큼 연결을 유지해야 풀이 넘쳐 연결을 버리지 않는다
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class LLMClient:
+    """재시도/마감 시간/회로 차단기를 갖춘 chat completions 클라이언트 (스레드 안전)"""
+
+    def __init__(self, endpoint: str = FN_CALL_ENDPOINT, api_key: str = FN_CALL_KEY,
+                 attempt_timeout: float = config.LLM_ATTEMPT_TIMEOUT,
+                 deadline: float = config.LLM_DEADLINE,
+                 max_attempts: int = config.LLM_MAX_ATTEMPTS,
+                 max_backoff: float = config.LLM_MAX_BACKOFF,
+                 breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 session: Any = None):
+        self.endpoint = endpoint
+        self.headers = {
+            "Content-Type": "application/json",
+            "api-key": api_key
+        }
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        # 모든 호출과 세션이 공유하는 연결 풀
+        self.session = session or create_http_session()
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        # Retry-After 가 있으면 따르고, 없으면 0.5·2^n 초 상한 안에서 무작위 (full jitter)
+        error = retry_state.outcome.exception()
+        wait = retry_after_seconds(getattr(error, 'response', None))
+        if wait is None:
+            wait = random.uniform(0, min(self.max_backoff, 0.5 * 2 ** retry_state.attempt_number))
+        remaining = self.deadline - (time.monotonic() - retry_state.start_time)
+        return max(0.0, min(wait, remaining))
+
+    def _send(self, payload: Dict[str, Any], started: float, estimated_tokens: int,
+              stream: bool = False) -> requests.Response:
+        # 재시도도 한도를 소모하므로 시도마다 확보 (남은 마감 시간 안에 확보하지 못하면 RateLimitTimeout)
+        if self.limiter:
+            self.limiter.acquire(estimated_tokens, timeout=max(0.0, self.deadline - (time.monotonic() - started)))
+        self.breaker.before_call()
+        timeout = min(self.attempt_timeout, max(1.0, self.deadline - (time.monotonic() - started)))
+        try:
+            response = self.session.post(self.endpoint, headers=self.headers, json=payload, timeout=timeout,
+                                         stream=stream)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            # 요청 자체가 잘못된 경우(4xx)나 처리량 제한(429)은 엔드포인트 장애로 보지 않는다
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status is None or status >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            # HTTP/2 어댑터의 httpx/h2 원시 예외 등 - 어떤 예외로 끝나도 반 열림 시험 호출 상태가 남지 않게 실패로 기록
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+    def _post(self, payload: Dict[str, Any], started: float, estimated_tokens: int) -> LLMResponse:
+        result = self._send(payload, started, estimated_tokens).json()
+        usage = result.get('usage') or {}
+        if self.limiter:
+            self.limiter.record_usage(estimated_tokens, usage.get('total_tokens'))
+        return LLMResponse(result['choices'][0]['message']['content'], usage)
+
+    def _retrying(self) -> Retrying:
+        return Retrying(
+            retry=retry_if_exception(is_retryable),
+            wait=self._wait,
+            stop=stop_after_attempt(self.max_attempts) | stop_after_delay(self.deadline),
+            reraise=True,
+        )
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int = 1500, **options: Any) -> LLMResponse:
+        """chat completions 호출 - 재시도 후에도 실패하면 requests.exceptions.RequestException 발생"""
+        payload = {"messages": messages, "max_tokens": max_tokens, **options}
+        return self._retrying()(self._post, payload, time.monotonic(), estimate_request_tokens(messages, max_tokens))
+
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int = 1500, **options: Any) -> Iterator[str]:
+        """SSE(stream: true) 로 응답 조각을 받는 대로 내보냄.
+
+        응답이 시작되기 전까지만 재시도하며, 수신 도중 끊기거나 마감 시간을 넘기면
+        requests.exceptions.RequestException 발생.
+        """
+        payload = {"messages": messages, "max_tokens": max_tokens, "stream": True, **options}
+        started = time.monotonic()
+        response = self._retrying()(self._send, payload, started, estimate_request_tokens(messages, max_tokens),
+                                    True)
+        try:
+            for line in response.iter_lines():
+                if time.monotonic() - started > self.deadline:
+                    raise requests.exceptions.Timeout("LLM 응답이 마감 시간 안에 끝나지 않았습니다")
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    # break 하지 않고 끝까지 읽어야 연결이 풀로 돌아간다
+                    continue
+                # 첫 조각은 choices 없이 콘텐츠 필터 결과만 담겨 올 수 있다
+                choices = json.loads(data).get('choices') or []
+                content = choices[0].get('delta', {}).get('content') if choices else None
+                if content:
+                    yield content
+        finally:
+            response.close()
+
+
+# 프로세스 전체에서 회로 차단기와 호출 한도를 공유하는 기본 클라이언트
+llm = LLMClient(limiter=RateLimiter())
@@ -2,7 +2,7 @@ import streamlit as st
 from streamlit_option_menu import option_menu
 from database_manager import db
 from data_management import manage_students, manage_passages_and_questions, manage_report
-from analysis import analyze_feedback, show_detailed_analysis
+from analysis import analyze_feedback, batch_grade_feedback, show_detailed_analysis
 from statistics import show_overall_statistics, show_student_statistics, show_passage_statistics
 
 def main():
@@ -59,11 +59,13 @@ def main():
 
         elif selected == "AI 첨삭 분석":
             st.title("AI 첨삭 분석")
-            tabs = st.tabs(["🤖 AI 첨삭", "📊 분석 결과"])
+            tabs = st.tabs(["🤖 AI 첨삭", "🏫 일괄 첨삭", "📊 분석 결과"])
 
             with tabs[0]:
                 analyze_feedback()
             with tabs[1]:
+                batch_grade_feedback()
+            with tabs[2]:
                 show_detailed_analysis()
 
         else:  # 통계 대시보드
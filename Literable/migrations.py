@@ -0,0 +1,389 @@
+import re
+import sqlite3
+from typing import Callable, List, Tuple, Union
+from rollups import question_passage_trigger_sql, rollup_schema_sql, rebuild_rollups
+
+# 최초 버전의 테이블. 이후 변경은 아래 MIGRATIONS 로만 추가한다.
+BASE_SCHEMA: List[str] = [
+    # Create students table
+    '''CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        school TEXT,
+        student_number TEXT
+    )''',
+    # Create passages table
+    '''CREATE TABLE IF NOT EXISTS passages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        passage TEXT
+    )''',
+    # Create questions table
+    '''CREATE TABLE IF NOT EXISTS questions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        passage_id INTEGER,
+        question TEXT,
+        model_answer TEXT,
+        category TEXT DEFAULT '',
+        FOREIGN KEY (passage_id) REFERENCES passages (id)
+    )''',
+    # Create student_answers table
+    '''CREATE TABLE IF NOT EXISTS student_answers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        question_id INTEGER,
+        student_answer TEXT,
+        score INTEGER,
+        feedback TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(student_id, question_id),
+        FOREIGN KEY (student_id) REFERENCES students (id),
+        FOREIGN KEY (question_id) REFERENCES questions (id)
+    )''',
+]
+
+# 지문/문제 전문 검색 색인 (마이그레이션 3).
+# trigram 토크나이저는 띄어쓰기와 무관하게 3글자 부분 문자열로 색인하므로 조사가 붙는 한국어에서도
+# 부분 일치 검색이 가능하다. SQLite 3.34 이상에서만 지원되며, 그보다 오래된 SQLite(예: Ubuntu 20.04 의
+# 3.31)에서는 색인 없이 LIKE 검색만 쓰고, 나중에 SQLite 가 올라가면 init_schema 가 색인을 만든다.
+TRIGRAM_MIN_SQLITE_VERSION = (3, 34, 0)
+
+SEARCH_INDEX_SQL: List[str] = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+           title, passage, content='passages', content_rowid='id', tokenize='trigram')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+           question, model_answer, content='questions', content_rowid='id', tokenize='trigram')""",
+    # external content 테이블 동기화 트리거
+    """CREATE TRIGGER IF NOT EXISTS passages_fts_ai AFTER INSERT ON passages BEGIN
+           INSERT INTO passages_fts (rowid, title, passage) VALUES (new.id, new.title, new.passage);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS passages_fts_ad AFTER DELETE ON passages BEGIN
+           INSERT INTO passages_fts (passages_fts, rowid, title, passage)
+           VALUES ('delete', old.id, old.title, old.passage);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS passages_fts_au AFTER UPDATE OF title, passage ON passages BEGIN
+           INSERT INTO passages_fts (passages_fts, rowid, title, passage)
+           VALUES ('delete', old.id, old.title, old.passage);
+           INSERT INTO passages_fts (rowid, title, passage) VALUES (new.id, new.title, new.passage);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+           INSERT INTO questions_fts (rowid, question, model_answer)
+           VALUES (new.id, new.question, new.model_answer);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+           INSERT INTO questions_fts (questions_fts, rowid, question, model_answer)
+           VALUES ('delete', old.id, old.question, old.model_answer);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF question, model_answer ON questions BEGIN
+           INSERT INTO questions_fts (questions_fts, rowid, question, model_answer)
+           VALUES ('delete', old.id, old.question, old.model_answer);
+           INSERT INTO questions_fts (rowid, question, model_answer)
+           VALUES (new.id, new.question, new.model_answer);
+       END""",
+    # 기존 데이터 색인
+    "INSERT INTO passages_fts (passages_fts) VALUES ('rebuild')",
+    "INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')",
+]
+
+
+# 2글자 검색어용 bigram 색인 (마이그레이션 12).
+# trigram 색인은 3글자 미만 검색어를 찾지 못하므로 "예술", "인종" 같은 2글자 단어를 위해 지문/문제를 글자 bigram
+# 토큰열("예술가는" → "예술 술가 가는")로 바꿔 unicode61 토크나이저로 색인한다. 검색어도 같은 bigram 구(phrase)로
+# 바꾸어 찾으므로 단어 안의 부분 문자열 일치가 된다. 원문은 저장하지 않는 contentless 테이블이고,
+# 트리거가 literable_bigrams() SQL 함수를 쓰므로 register_functions 를 거치지 않은 연결(SQLite 셸 등)에서는
+# 지문/문제를 수정할 수 없다 (db_tools.py 또는 앱을 사용).
+BIGRAM_FUNCTION = "literable_bigrams"
+_BIGRAM_RUN = re.compile(r"[^\W_]+")
+
+
+def bigram_text(text: str) -> str:
+    """Space-separated overlapping character bigrams of each word run (1-character runs kept as is)"""
+    tokens = []
+    for run in _BIGRAM_RUN.findall((text or "").lower()):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return " ".join(tokens)
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """Register the SQL functions the schema's triggers call; needed on every connection that writes"""
+    conn.create_function(BIGRAM_FUNCTION, 1, bigram_text, deterministic=True)
+
+
+BIGRAM_INDEX_SQL: List[str] = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS passages_bigram USING fts5(
+           title, passage, content='', tokenize='unicode61')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS questions_bigram USING fts5(
+           question, model_answer, content='', tokenize='unicode61')""",
+    # contentless 테이블은 삭제할 때 색인했던 값을 그대로 다시 넘겨야 한다
+    f"""CREATE TRIGGER IF NOT EXISTS passages_bigram_ai AFTER INSERT ON passages BEGIN
+           INSERT INTO passages_bigram (rowid, title, passage)
+           VALUES (new.id, {BIGRAM_FUNCTION}(new.title), {BIGRAM_FUNCTION}(new.passage));
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS passages_bigram_ad AFTER DELETE ON passages BEGIN
+           INSERT INTO passages_bigram (passages_bigram, rowid, title, passage)
+           VALUES ('delete', old.id, {BIGRAM_FUNCTION}(old.title), {BIGRAM_FUNCTION}(old.passage));
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS passages_bigram_au AFTER UPDATE OF title, passage ON passages BEGIN
+           INSERT INTO passages_bigram (passages_bigram, rowid, title, passage)
+           VALUES ('delete', old.id, {BIGRAM_FUNCTION}(old.title), {BIGRAM_FUNCTION}(old.passage));
+           INSERT INTO passages_bigram (rowid, title, passage)
+           VALUES (new.id, {BIGRAM_FUNCTION}(new.title), {BIGRAM_FUNCTION}(new.passage));
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_bigram_ai AFTER INSERT ON questions BEGIN
+           INSERT INTO questions_bigram (rowid, question, model_answer)
+           VALUES (new.id, {BIGRAM_FUNCTION}(new.question), {BIGRAM_FUNCTION}(new.model_answer));
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_bigram_ad AFTER DELETE ON questions BEGIN
+           INSERT INTO questions_bigram (questions_bigram, rowid, question, model_answer)
+           VALUES ('delete', old.id, {BIGRAM_FUNCTION}(old.question), {BIGRAM_FUNCTION}(old.model_answer));
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_bigram_au AFTER UPDATE OF question, model_answer ON questions BEGIN
+           INSERT INTO questions_bigram (questions_bigram, rowid, question, model_answer)
+           VALUES ('delete', old.id, {BIGRAM_FUNCTION}(old.question), {BIGRAM_FUNCTION}(old.model_answer));
+           INSERT INTO questions_bigram (rowid, question, model_answer)
+           VALUES (new.id, {BIGRAM_FUNCTION}(new.question), {BIGRAM_FUNCTION}(new.model_answer));
+       END""",
+]
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'passages_fts'").fetchone() is not None
+
+
+def create_search_index(conn: sqlite3.Connection) -> bool:
+    """Create the FTS5 trigram index if this SQLite supports it; return whether it exists"""
+    if has_search_index(conn):
+        return True
+    if sqlite3.sqlite_version_info < TRIGRAM_MIN_SQLITE_VERSION:
+        print(f"[Literable] SQLite {sqlite3.sqlite_version} has no FTS5 trigram tokenizer "
+              f"(needs {'.'.join(map(str, TRIGRAM_MIN_SQLITE_VERSION))}); search falls back to LIKE")
+        return False
+    conn.execute("SAVEPOINT search_index")
+    try:
+        for statement in SEARCH_INDEX_SQL:
+            conn.execute(statement)
+    except sqlite3.OperationalError as e:
+        # FTS5 없이 빌드된 SQLite
+        conn.execute("ROLLBACK TO search_index")
+        conn.execute("RELEASE search_index")
+        print(f"[Literable] full-text search index unavailable ({e}); search falls back to LIKE")
+        return False
+    conn.execute("RELEASE search_index")
+    return True
+
+
+def has_bigram_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'passages_bigram'").fetchone() is not None
+
+
+def _fill_bigram_index(conn: sqlite3.Connection) -> None:
+    conn.execute("INSERT INTO passages_bigram (passages_bigram) VALUES ('delete-all')")
+    conn.execute("INSERT INTO questions_bigram (questions_bigram) VALUES ('delete-all')")
+    conn.execute(f"""INSERT INTO passages_bigram (rowid, title, passage)
+                     SELECT id, {BIGRAM_FUNCTION}(title), {BIGRAM_FUNCTION}(passage) FROM passages""")
+    conn.execute(f"""INSERT INTO questions_bigram (rowid, question, model_answer)
+                     SELECT id, {BIGRAM_FUNCTION}(question), {BIGRAM_FUNCTION}(model_answer) FROM questions""")
+
+
+def create_bigram_index(conn: sqlite3.Connection) -> bool:
+    """Create and fill the FTS5 bigram index for short search terms; return whether it exists"""
+    if has_bigram_index(conn):
+        return True
+    conn.execute("SAVEPOINT bigram_index")
+    try:
+        for statement in BIGRAM_INDEX_SQL:
+            conn.execute(statement)
+        _fill_bigram_index(conn)
+    except sqlite3.OperationalError as e:
+        # FTS5 없이 빌드된 SQLite
+        conn.execute("ROLLBACK TO bigram_index")
+        conn.execute("RELEASE bigram_index")
+        print(f"[Literable] bigram search index unavailable ({e}); short search terms fall back to LIKE")
+        return False
+    conn.execute("RELEASE bigram_index")
+    return True
+
+
+def rebuild_search_indexes(conn: sqlite3.Connection) -> None:
+    """Re-index passages and questions in every search index that exists (after bulk loads without triggers)"""
+    if has_search_index(conn):
+        conn.execute("INSERT INTO passages_fts (passages_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')")
+    if has_bigram_index(conn):
+        _fill_bigram_index(conn)
+
+
+# 스키마 변경 이력. PRAGMA user_version 에 마지막으로 적용된 번호가 기록되며,
+# 이미 배포된 항목은 수정하지 말고 항상 새 번호를 뒤에 추가한다.
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, "index questions by passage", [
+        # fetch_questions, fetch_student_answers(passage), get_passage_statistics
+        "CREATE INDEX IF NOT EXISTS idx_questions_passage ON questions (passage_id, id)",
+    ]),
+    (2, "covering indexes for student answer lookups", [
+        # fetch_student_answers(student), get_student_statistics (평균 + 제출 이력)
+        """CREATE INDEX IF NOT EXISTS idx_answers_student_created
+           ON student_answers (student_id, created_at, score, question_id)""",
+        # get_passage_statistics, 문제별 집계
+        "CREATE INDEX IF NOT EXISTS idx_answers_question_score ON student_answers (question_id, score)",
+        # 기간별 조회/정렬
+        "CREATE INDEX IF NOT EXISTS idx_answers_created ON student_answers (created_at)",
+    ]),
+    (3, "FTS5 trigram search over passages and questions", [
+        # SQLite 가 trigram 을 지원하지 않으면 건너뜀 (LIKE 검색)
+        create_search_index,
+    ]),
+    (4, "keyset pagination indexes for student and passage listings", [
+        "CREATE INDEX IF NOT EXISTS idx_students_name ON students (name, id)",
+        "CREATE INDEX IF NOT EXISTS idx_passages_title ON passages (title, id)",
+    ]),
+    (5, "trigger-maintained statistics rollups", [
+        # 전체 최소/최대 점수 재계산용
+        "CREATE INDEX IF NOT EXISTS idx_answers_score ON student_answers (score)",
+        *rollup_schema_sql(),
+        rebuild_rollups,
+    ]),
+    (6, "batch grading jobs", [
+        """CREATE TABLE IF NOT EXISTS grading_jobs (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               passage_id INTEGER NOT NULL,
+               scope TEXT NOT NULL,
+               school TEXT,
+               created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (passage_id) REFERENCES passages (id)
+           )""",
+        # 답안별 상태: pending → running → done / failed (실패 항목은 재실행 시 다시 시도)
+        """CREATE TABLE IF NOT EXISTS grading_job_items (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               job_id INTEGER NOT NULL,
+               answer_id INTEGER NOT NULL,
+               status TEXT NOT NULL DEFAULT 'pending',
+               attempts INTEGER NOT NULL DEFAULT 0,
+               error TEXT,
+               updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+               UNIQUE(job_id, answer_id),
+               FOREIGN KEY (job_id) REFERENCES grading_jobs (id),
+               FOREIGN KEY (answer_id) REFERENCES student_answers (id)
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_grading_items_status ON grading_job_items (job_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_grading_items_answer ON grading_job_items (answer_id)",
+        # 답안이 지워지면 (학생/지문/문제 삭제 포함) 작업 항목도 함께 지운다
+        """CREATE TRIGGER IF NOT EXISTS grading_items_answer_ad AFTER DELETE ON student_answers BEGIN
+               DELETE FROM grading_job_items WHERE answer_id = OLD.id;
+           END""",
+        "CREATE INDEX IF NOT EXISTS idx_grading_jobs_passage ON grading_jobs (passage_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_students_school ON students (school)",
+    ]),
+    (7, "grading result cache", [
+        # key: 프롬프트/문제/모범답안/정규화된 학생답안/모델의 sha256 (grading_cache.cache_key)
+        """CREATE TABLE IF NOT EXISTS grading_cache (
+               key TEXT PRIMARY KEY,
+               score INTEGER NOT NULL,
+               feedback TEXT NOT NULL,
+               created_at REAL NOT NULL,
+               last_used_at REAL NOT NULL
+           ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_grading_cache_used ON grading_cache (last_used_at)",
+    ]),
+    (8, "prompt version of AI grades", [
+        # 채점에 쓴 프롬프트의 버전 (prompt_registry.prompt_version), 직접 입력한 점수는 NULL
+        "ALTER TABLE student_answers ADD COLUMN prompt_version TEXT",
+    ]),
+    (9, "condensed grading context per question", [
+        # source_hash: 지문/문제/모범답안과 압축 알고리즘 버전의 sha256 (grading_context.source_hash)
+        """CREATE TABLE IF NOT EXISTS grading_contexts (
+               question_id INTEGER PRIMARY KEY,
+               source_hash TEXT NOT NULL,
+               context TEXT NOT NULL,
+               created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (question_id) REFERENCES questions (id)
+           )""",
+        # 원문이 바뀌거나 문제가 지워지면 압축 컨텍스트도 지운다 (다음 저장/채점 때 다시 계산)
+        """CREATE TRIGGER IF NOT EXISTS grading_contexts_question_au
+           AFTER UPDATE OF passage_id, question, model_answer ON questions BEGIN
+               DELETE FROM grading_contexts WHERE question_id = OLD.id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS grading_contexts_question_ad AFTER DELETE ON questions BEGIN
+               DELETE FROM grading_contexts WHERE question_id = OLD.id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS grading_contexts_passage_au AFTER UPDATE OF passage ON passages BEGIN
+               DELETE FROM grading_contexts
+               WHERE question_id IN (SELECT id FROM questions WHERE passage_id = OLD.id);
+           END""",
+    ]),
+    (10, "grading job item leases", [
+        # 항목을 가져간 실행(run_token)과 임대 만료 시각(unix time). 만료된 running 항목만 다른 실행이 다시 가져간다
+        "ALTER TABLE grading_job_items ADD COLUMN run_token TEXT",
+        "ALTER TABLE grading_job_items ADD COLUMN leased_until REAL",
+    ]),
+    (11, "move passage statistics when a question changes passage", [
+        question_passage_trigger_sql(),
+        # 트리거가 생기기 전에 지문이 바뀐 문제가 있었을 수 있으므로 한 번 다시 집계
+        rebuild_rollups,
+    ]),
+    (12, "FTS5 bigram search index for 2-character terms", [
+        create_bigram_index,
+    ]),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Return the migration number recorded in PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def init_schema(conn: sqlite3.Connection) -> List[int]:
+    """Create the base tables if missing, then apply pending migrations"""
+    register_functions(conn)
+    for statement in BASE_SCHEMA:
+        conn.execute(statement)
+    applied = run_migrations(conn)
+    # 검색 색인 없이 마이그레이션된 DB 는 SQLite 가 trigram 을 지원하게 되면 색인을 만든다
+    if not has_search_index(conn) and sqlite3.sqlite_version_info >= TRIGRAM_MIN_SQLITE_VERSION:
+        if create_search_index(conn):
+            print("[Literable] created full-text search index")
+        conn.commit()
+    return applied
+
+
+def run_migrations(conn: sqlite3.Connection) -> List[int]:
+    """Apply every pending migration, each in its own transaction.
+
+    Safe to call on every startup and from several processes at once: the
+    version is re-read under a write lock, so a migration applied by another
+    process is skipped. Returns the versions applied by this call.
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            # PRAGMA 는 바인딩 파라미터를 지원하지 않음 (version 은 정수 상수)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[Literable] applied migration {version}: {description}")
+        applied.append(version)
+
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Tuple
+import config
+
+# 카테고리별 채점 프롬프트를 한 번만 읽어 메모리에서 제공하는 레지스트리.
+# 파일이 바뀌었는지는 check_interval 초에 한 번만 mtime/크기로 확인하고, 바뀐 파일만 다시 읽는다.
+# 내용의 sha256 앞부분을 프롬프트 버전으로 채점 결과와 함께 저장한다.
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+CATEGORY_PROMPT_MAP = {
+    '사실적 독해': 'factual',
+    '추론적 독해': 'inferential',
+    '비판적 독해': 'critical',
+    '창의적 독해': 'creative',
+    '': 'default'
+}
+
+
+class Prompt(NamedTuple):
+    name: str
+    text: str
+    version: str
+
+
+def prompt_version(text: str) -> str:
+    """프롬프트 내용의 안정적인 버전 (sha256 앞 12자리)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+class PromptRegistry:
+    """prompts/*.txt 를 캐시하는 레지스트리 (스레드 안전)"""
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, check_interval: float = config.PROMPT_RELOAD_INTERVAL):
+        self.prompts_dir = prompts_dir
+        self.check_interval = check_interval
+        # 파일 이름 -> ((mtime_ns, size), Prompt)
+        self._prompts: Dict[str, Tuple[Tuple[int, int], Prompt]] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> Prompt:
+        path = os.path.join(self.prompts_dir, f"{name}.txt")
+        with self._lock:
+            cached = self._prompts.get(name)
+            now = time.monotonic()
+            if cached and now - self._checked_at.get(name, 0.0) < self.check_interval:
+                return cached[1]
+            self._checked_at[name] = now
+
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        with open(path, 'r', encoding='utf-8') as file:
+            text = file.read()
+        prompt = Prompt(name, text, prompt_version(text))
+        with self._lock:
+            # 저장만 다시 하고 내용이 같으면 기존 객체(같은 버전)를 유지
+            if cached and cached[1].version == prompt.version:
+                prompt = cached[1]
+            self._prompts[name] = (signature, prompt)
+        return prompt
+
+    def get(self, category: str) -> Prompt:
+        """카테고리의 프롬프트 (파일이 없으면 default) - default 도 없으면 FileNotFoundError"""
+        name = CATEGORY_PROMPT_MAP.get(category or '', 'default')
+        try:
+            return self._load(name)
+        except FileNotFoundError:
+            if name == 'default':
+                raise
+            return self._load('default')
+
+    def all(self) -> Dict[str, Prompt]:
+        """모든 카테고리의 프롬프트 {카테고리: Prompt}"""
+        return {category: self.get(category) for category in CATEGORY_PROMPT_MAP}
+
+
+prompts = PromptRegistry()
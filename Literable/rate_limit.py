@@ -0,0 +1,157 @@
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import requests
+import config
+
+# Azure OpenAI 배포의 분당 요청 수(RPM)/토큰 수(TPM) 한도에 맞춰 호출 속도를 조절하는 토큰 버킷.
+# 기본은 프로세스 안의 모든 세션이 공유하고, LLM_RATE_LIMIT_DB 를 지정하면 같은 SQLite 파일을
+# 쓰는 여러 프로세스(여러 Streamlit 서버/일괄 채점 스크립트)가 한도를 함께 나눠 쓴다.
+
+# Azure 는 분당 한도를 더 짧은 구간으로 나눠 검사하므로 한 번에 몰아 쓸 수 있는 양을 10초 분량으로 제한
+BURST_SECONDS = 10
+
+
+class RateLimitTimeout(requests.exceptions.RequestException):
+    """마감 시간 안에 호출 한도가 확보되지 않음"""
+
+
+class TokenBucket:
+    """분당 rate_per_minute 만큼 채워지는 프로세스 내 토큰 버킷 (스레드 안전)"""
+
+    def __init__(self, name: str, rate_per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, amount: float) -> float:
+        """amount 를 차감하고 0 을 반환하거나, 부족하면 더 기다려야 할 초를 반환"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def charge(self, amount: float) -> None:
+        """실제 사용량이 예상보다 많았을 때 초과분 차감 (음수 잔량 허용)"""
+        with self._lock:
+            self._tokens -= amount
+
+    def acquire(self, amount: float, timeout: Optional[float] = None) -> float:
+        """토큰이 모일 때까지 기다렸다가 차감하고 기다린 시간을 반환"""
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        while True:
+            wait = self._take(amount)
+            if wait <= 0:
+                return time.monotonic() - started
+            if timeout is not None and time.monotonic() - started + wait > timeout:
+                raise RateLimitTimeout(f"{self.name} 한도 대기 시간이 마감 시간을 넘습니다 ({wait:.1f}초 필요)")
+            time.sleep(wait)
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """SQLite 파일에 상태를 두어 여러 프로세스가 공유하는 토큰 버킷"""
+
+    def __init__(self, name: str, rate_per_minute: float, db_path: str, burst_seconds: float = BURST_SECONDS):
+        super().__init__(name, rate_per_minute, burst_seconds)
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def _update(self, amount: float, allow_negative: bool) -> float:
+        # 프로세스 간 시계가 같아야 하므로 monotonic 대신 벽시계 사용
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE name = ?",
+                               (self.name,)).fetchone()
+            tokens = self.capacity if row is None else \
+                min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+            wait = 0.0
+            if tokens >= amount or allow_negative:
+                tokens -= amount
+            else:
+                wait = (amount - tokens) / self.rate
+            conn.execute("""
+                INSERT INTO rate_limit_buckets (name, tokens, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            """, (self.name, tokens, now))
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    def _take(self, amount: float) -> float:
+        return self._update(amount, allow_negative=False)
+
+    def charge(self, amount: float) -> None:
+        self._update(amount, allow_negative=True)
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 보수적인 토큰 수 추정 (한글 등 비 ASCII 는 글자당 1, ASCII 는 4글자당 1)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Azure 가 한도 계산에 쓰는 방식처럼 프롬프트 토큰 + max_tokens 로 요청 비용 추정"""
+    return sum(estimate_tokens(message.get("content") or "") + 4 for message in messages) + max_tokens
+
+
+class RateLimiter:
+    """RPM/TPM 버킷을 함께 적용 (한도가 0 이면 해당 버킷 없음)"""
+
+    def __init__(self, requests_per_minute: int = config.LLM_RPM, tokens_per_minute: int = config.LLM_TPM,
+                 db_path: str = config.LLM_RATE_LIMIT_DB, name: str = "azure-gpt-4o"):
+        def bucket(kind: str, rate: int) -> Optional[TokenBucket]:
+            if rate <= 0:
+                return None
+            if db_path:
+                return SQLiteTokenBucket(f"{name}:{kind}", rate, db_path)
+            return TokenBucket(f"{name}:{kind}", rate)
+
+        self.requests = bucket("rpm", requests_per_minute)
+        self.tokens = bucket("tpm", tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int, timeout: Optional[float] = None) -> float:
+        """요청 1건과 예상 토큰을 확보할 때까지 대기하고 기다린 시간을 반환"""
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1, timeout)
+        if self.tokens:
+            try:
+                waited += self.tokens.acquire(estimated_tokens,
+                                              None if timeout is None else max(0.0, timeout - waited))
+            except RateLimitTimeout:
+                # 요청을 보내지 않았으므로 확보해 둔 요청 1건을 돌려준다
+                if self.requests:
+                    self.requests.charge(-1)
+                raise
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """응답의 실제 토큰 수가 예상보다 많으면 초과분을 차감"""
+        if self.tokens and actual_tokens and actual_tokens > estimated_tokens:
+            self.tokens.charge(actual_tokens - estimated_tokens)
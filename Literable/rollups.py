@@ -0,0 +1,243 @@
+import sqlite3
+from typing import List, NamedTuple, Optional
+
+# student_answers 집계 테이블 정의.
+# 각 테이블은 키별 (답안 수, 점수 개수/합/제곱합/최소/최대)를 보관하며 student_answers 의
+# INSERT/UPDATE/DELETE 트리거로 증분 갱신된다. 평균과 표준편차는 합/제곱합에서 O(1)로 계산한다.
+
+GRADE_CASE = """CASE
+            WHEN {score} >= 90 THEN 'A (90-100)'
+            WHEN {score} >= 80 THEN 'B (80-89)'
+            WHEN {score} >= 70 THEN 'C (70-79)'
+            WHEN {score} >= 60 THEN 'D (60-69)'
+            ELSE 'F (0-59)'
+        END"""
+
+
+class Rollup(NamedTuple):
+    table: str
+    key: str
+    key_type: str
+    # 답안 행(alias: {row}.)으로부터 키를 구하는 식
+    key_expr: str
+    # 재집계(rebuild) 시 sa(student_answers), q(questions) 기준 키 식과 FROM 절
+    rebuild_key: str
+    rebuild_from: str
+    # 최소/최대 점수를 가진 답안이 빠졌을 때 키 {key} 의 최소/최대를 다시 구하는 식.
+    # None 이면 최소/최대를 보관하지 않는다 (score_min/score_max 는 NULL).
+    min_expr: Optional[str]
+    max_expr: Optional[str]
+
+
+_ANSWERS_WITH_QUESTION = "student_answers sa JOIN questions q ON q.id = sa.question_id"
+
+# 트리거 안에서 순서대로 갱신되므로 stats_question 을 참조하는 롤업은 그보다 뒤에 둔다.
+ROLLUPS: List[Rollup] = [
+    Rollup(
+        "stats_overall", "id", "INTEGER", "1", "1", "student_answers sa",
+        "(SELECT MIN(score) FROM student_answers)",
+        "(SELECT MAX(score) FROM student_answers)",
+    ),
+    Rollup(
+        "stats_student", "student_id", "INTEGER", "{row}.student_id", "sa.student_id", "student_answers sa",
+        "(SELECT MIN(score) FROM student_answers WHERE student_id = {key})",
+        "(SELECT MAX(score) FROM student_answers WHERE student_id = {key})",
+    ),
+    Rollup(
+        "stats_question", "question_id", "INTEGER", "{row}.question_id", "sa.question_id", "student_answers sa",
+        "(SELECT MIN(score) FROM student_answers WHERE question_id = {key})",
+        "(SELECT MAX(score) FROM student_answers WHERE question_id = {key})",
+    ),
+    Rollup(
+        "stats_passage", "passage_id", "INTEGER",
+        "(SELECT passage_id FROM questions WHERE id = {row}.question_id)",
+        "q.passage_id", _ANSWERS_WITH_QUESTION,
+        """(SELECT MIN(sq.score_min) FROM stats_question sq
+            JOIN questions q ON q.id = sq.question_id WHERE q.passage_id = {key})""",
+        """(SELECT MAX(sq.score_max) FROM stats_question sq
+            JOIN questions q ON q.id = sq.question_id WHERE q.passage_id = {key})""",
+    ),
+    Rollup(
+        "stats_category", "category", "TEXT",
+        "(SELECT COALESCE(category, '') FROM questions WHERE id = {row}.question_id)",
+        "COALESCE(q.category, '')", _ANSWERS_WITH_QUESTION,
+        """(SELECT MIN(sq.score_min) FROM stats_question sq
+            JOIN questions q ON q.id = sq.question_id WHERE COALESCE(q.category, '') = {key})""",
+        """(SELECT MAX(sq.score_max) FROM stats_question sq
+            JOIN questions q ON q.id = sq.question_id WHERE COALESCE(q.category, '') = {key})""",
+    ),
+    Rollup(
+        "stats_day", "day", "TEXT", "date({row}.created_at)", "date(sa.created_at)", "student_answers sa",
+        """(SELECT MIN(score) FROM student_answers
+            WHERE created_at >= {key} AND created_at < date({key}, '+1 day'))""",
+        """(SELECT MAX(score) FROM student_answers
+            WHERE created_at >= {key} AND created_at < date({key}, '+1 day'))""",
+    ),
+    Rollup(
+        "stats_grade", "grade", "TEXT", GRADE_CASE.format(score="{row}.score"),
+        GRADE_CASE.format(score="sa.score"), "student_answers sa", None, None,
+    ),
+]
+
+
+def _create_table_sql(rollup: Rollup) -> str:
+    return f"""CREATE TABLE IF NOT EXISTS {rollup.table} (
+        {rollup.key} {rollup.key_type} PRIMARY KEY,
+        answer_count INTEGER NOT NULL DEFAULT 0,
+        score_count INTEGER NOT NULL DEFAULT 0,
+        score_sum INTEGER NOT NULL DEFAULT 0,
+        score_sumsq INTEGER NOT NULL DEFAULT 0,
+        score_min INTEGER,
+        score_max INTEGER
+    )"""
+
+
+def _add_sql(rollup: Rollup, row: str) -> str:
+    """Statement adding answer row ``row`` (NEW/OLD) to the rollup"""
+    key = rollup.key_expr.format(row=row)
+    score = f"{row}.score"
+    extreme = score if rollup.min_expr else "NULL"
+    return f"""INSERT INTO {rollup.table}
+            ({rollup.key}, answer_count, score_count, score_sum, score_sumsq, score_min, score_max)
+        SELECT k, 1, {score} IS NOT NULL, COALESCE({score}, 0), COALESCE({score} * {score}, 0), {extreme}, {extreme}
+        FROM (SELECT {key} AS k) WHERE k IS NOT NULL
+        ON CONFLICT ({rollup.key}) DO UPDATE SET
+            answer_count = answer_count + 1,
+            score_count = score_count + excluded.score_count,
+            score_sum = score_sum + excluded.score_sum,
+            score_sumsq = score_sumsq + excluded.score_sumsq,
+            score_min = CASE WHEN score_min IS NULL OR excluded.score_min < score_min
+                             THEN COALESCE(excluded.score_min, score_min) ELSE score_min END,
+            score_max = CASE WHEN score_max IS NULL OR excluded.score_max > score_max
+                             THEN COALESCE(excluded.score_max, score_max) ELSE score_max END;"""
+
+
+def _remove_sql(rollup: Rollup, row: str) -> str:
+    """Statements removing answer row ``row`` (OLD) from the rollup"""
+    key = rollup.key_expr.format(row=row)
+    score = f"{row}.score"
+    statements = [f"""UPDATE {rollup.table} SET
+            answer_count = answer_count - 1,
+            score_count = score_count - ({score} IS NOT NULL),
+            score_sum = score_sum - COALESCE({score}, 0),
+            score_sumsq = score_sumsq - COALESCE({score} * {score}, 0)
+        WHERE {rollup.key} = {key};"""]
+    if rollup.min_expr:
+        # 최소/최대는 빼기로 갱신할 수 없으므로 극값이 빠졌을 때만 인덱스로 다시 구함
+        statements.append(f"""UPDATE {rollup.table} SET
+            score_min = {rollup.min_expr.format(key=key)},
+            score_max = {rollup.max_expr.format(key=key)}
+        WHERE {rollup.key} = {key} AND {score} IS NOT NULL
+          AND ({score} <= score_min OR {score} >= score_max);""")
+    statements.append(f"DELETE FROM {rollup.table} WHERE {rollup.key} = {key} AND answer_count <= 0;")
+    return "\n        ".join(statements)
+
+
+def rollup_schema_sql() -> List[str]:
+    """CREATE statements for rollup tables and their maintenance triggers"""
+    statements = [_create_table_sql(rollup) for rollup in ROLLUPS]
+
+    adds_new = "\n        ".join(_add_sql(rollup, "NEW") for rollup in ROLLUPS)
+    removes_old = "\n        ".join(_remove_sql(rollup, "OLD") for rollup in ROLLUPS)
+    statements.append(f"""CREATE TRIGGER IF NOT EXISTS stats_answers_ai AFTER INSERT ON student_answers BEGIN
+        {adds_new}
+    END""")
+    statements.append(f"""CREATE TRIGGER IF NOT EXISTS stats_answers_ad AFTER DELETE ON student_answers BEGIN
+        {removes_old}
+    END""")
+    statements.append(f"""CREATE TRIGGER IF NOT EXISTS stats_answers_au
+        AFTER UPDATE OF student_id, question_id, score, created_at ON student_answers BEGIN
+        {removes_old}
+        {adds_new}
+    END""")
+
+    # 문제의 카테고리가 바뀌면 그 문제의 집계를 이전 카테고리에서 새 카테고리로 옮긴다
+    statements.append("""CREATE TRIGGER IF NOT EXISTS stats_questions_category_au
+        AFTER UPDATE OF category ON questions
+        WHEN COALESCE(OLD.category, '') <> COALESCE(NEW.category, '')
+         AND EXISTS (SELECT 1 FROM stats_question WHERE question_id = NEW.id) BEGIN
+        UPDATE stats_category SET
+            answer_count = answer_count - (SELECT answer_count FROM stats_question WHERE question_id = NEW.id),
+            score_count = score_count - (SELECT score_count FROM stats_question WHERE question_id = NEW.id),
+            score_sum = score_sum - (SELECT score_sum FROM stats_question WHERE question_id = NEW.id),
+            score_sumsq = score_sumsq - (SELECT score_sumsq FROM stats_question WHERE question_id = NEW.id)
+        WHERE category = COALESCE(OLD.category, '');
+        UPDATE stats_category SET
+            score_min = (SELECT MIN(sq.score_min) FROM stats_question sq
+                         JOIN questions q ON q.id = sq.question_id
+                         WHERE COALESCE(q.category, '') = COALESCE(OLD.category, '')),
+            score_max = (SELECT MAX(sq.score_max) FROM stats_question sq
+                         JOIN questions q ON q.id = sq.question_id
+                         WHERE COALESCE(q.category, '') = COALESCE(OLD.category, ''))
+        WHERE category = COALESCE(OLD.category, '');
+        DELETE FROM stats_category WHERE category = COALESCE(OLD.category, '') AND answer_count <= 0;
+        INSERT INTO stats_category
+            (category, answer_count, score_count, score_sum, score_sumsq, score_min, score_max)
+        SELECT COALESCE(NEW.category, ''), answer_count, score_count, score_sum, score_sumsq, score_min, score_max
+        FROM stats_question WHERE question_id = NEW.id
+        ON CONFLICT (category) DO UPDATE SET
+            answer_count = answer_count + excluded.answer_count,
+            score_count = score_count + excluded.score_count,
+            score_sum = score_sum + excluded.score_sum,
+            score_sumsq = score_sumsq + excluded.score_sumsq,
+            score_min = CASE WHEN score_min IS NULL OR excluded.score_min < score_min
+                             THEN COALESCE(excluded.score_min, score_min) ELSE score_min END,
+            score_max = CASE WHEN score_max IS NULL OR excluded.score_max > score_max
+                             THEN COALESCE(excluded.score_max, score_max) ELSE score_max END;
+    END""")
+    return statements
+
+
+def _move_question_sql(rollup: Rollup, old_key: str, new_key: str) -> str:
+    """Statements moving question NEW.id's stats_question totals from rollup key old_key to new_key"""
+    totals = ("answer_count", "score_count", "score_sum", "score_sumsq")
+    subtract = ",\n            ".join(
+        f"{column} = {column} - (SELECT {column} FROM stats_question WHERE question_id = NEW.id)" for column in totals)
+    return f"""UPDATE {rollup.table} SET
+            {subtract}
+        WHERE {rollup.key} = {old_key};
+        UPDATE {rollup.table} SET
+            score_min = {rollup.min_expr.format(key=old_key)},
+            score_max = {rollup.max_expr.format(key=old_key)}
+        WHERE {rollup.key} = {old_key};
+        DELETE FROM {rollup.table} WHERE {rollup.key} = {old_key} AND answer_count <= 0;
+        INSERT INTO {rollup.table}
+            ({rollup.key}, answer_count, score_count, score_sum, score_sumsq, score_min, score_max)
+        SELECT {new_key}, answer_count, score_count, score_sum, score_sumsq, score_min, score_max
+        FROM stats_question WHERE question_id = NEW.id AND {new_key} IS NOT NULL
+        ON CONFLICT ({rollup.key}) DO UPDATE SET
+            answer_count = answer_count + excluded.answer_count,
+            score_count = score_count + excluded.score_count,
+            score_sum = score_sum + excluded.score_sum,
+            score_sumsq = score_sumsq + excluded.score_sumsq,
+            score_min = CASE WHEN score_min IS NULL OR excluded.score_min < score_min
+                             THEN COALESCE(excluded.score_min, score_min) ELSE score_min END,
+            score_max = CASE WHEN score_max IS NULL OR excluded.score_max > score_max
+                             THEN COALESCE(excluded.score_max, score_max) ELSE score_max END;"""
+
+
+def question_passage_trigger_sql() -> str:
+    """Trigger moving a question's totals between stats_passage rows when its passage_id changes"""
+    stats_passage = next(rollup for rollup in ROLLUPS if rollup.table == "stats_passage")
+    return f"""CREATE TRIGGER IF NOT EXISTS stats_questions_passage_au
+        AFTER UPDATE OF passage_id ON questions
+        WHEN OLD.passage_id IS NOT NEW.passage_id
+         AND EXISTS (SELECT 1 FROM stats_question WHERE question_id = NEW.id) BEGIN
+        {_move_question_sql(stats_passage, "OLD.passage_id", "NEW.passage_id")}
+    END"""
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Recompute every rollup table from student_answers (caller commits)"""
+    for rollup in ROLLUPS:
+        extremes = "MIN(score), MAX(score)" if rollup.min_expr else "NULL, NULL"
+        conn.execute(f"DELETE FROM {rollup.table}")
+        conn.execute(f"""
+            INSERT INTO {rollup.table}
+                ({rollup.key}, answer_count, score_count, score_sum, score_sumsq, score_min, score_max)
+            SELECT k, COUNT(*), COUNT(score), COALESCE(SUM(score), 0), COALESCE(SUM(score * score), 0),
+                   {extremes}
+            FROM (SELECT {rollup.rebuild_key} AS k, sa.score AS score FROM {rollup.rebuild_from})
+            WHERE k IS NOT NULL
+            GROUP BY k
+        """)
@@ -18,7 +18,7 @@ def show_overall_statistics():
     with col2:
         st.metric("총 답안 수", f"{stats['total_answers']:,}개")
     with col3:
-        st.metric("응시 학생 수", f"{len(db.fetch_students()):,}명")
+        st.metric("응시 학생 수", f"{db.count_students():,}명")
 
     # 점수 분포 시각화
     if stats['grade_distribution']:
@@ -52,7 +52,7 @@ def show_student_statistics():
     st.subheader("학생별 분석")
 
     # 학생 선택
-    students = db.fetch_students()
+    students = db.fetch_student_options()
     if not students:
         st.info("등록된 학생이 없습니다.")
         return
@@ -115,7 +115,7 @@ def show_passage_statistics():
     st.subheader("지문별 분석")
 
     # 지문 선택
-    passages = db.fetch_passages()
+    passages = db.fetch_passage_titles()
     if not passages:
         st.info("등록된 지문이 없습니다.")
         return
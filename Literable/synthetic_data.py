@@ -0,0 +1,223 @@
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+from migrations import init_schema, rebuild_search_indexes
+from rollups import rebuild_rollups
+
+# 규모 테스트용 결정적(seed 고정) 합성 데이터 생성기.
+# 같은 seed 와 규모면 항상 같은 DB 내용이 만들어지므로 성능 변경 전후를 같은 데이터로 비교할 수 있다.
+
+CATEGORIES = ['사실적 독해', '추론적 독해', '비판적 독해', '창의적 독해']
+
+# 카테고리별 난이도 보정 (5점 만점 기준, 음수일수록 어려움)
+CATEGORY_DIFFICULTY = {
+    '사실적 독해': 0.6,
+    '추론적 독해': 0.0,
+    '비판적 독해': -0.4,
+    '창의적 독해': -0.2,
+}
+
+
+class SyntheticScale(NamedTuple):
+    students: int
+    passages: int
+    questions_per_passage: int
+    passages_per_student: int
+
+    @property
+    def answers(self) -> int:
+        return self.students * self.passages_per_student * self.questions_per_passage
+
+
+# 답안 수 = students × passages_per_student × questions_per_passage
+PRESETS: Dict[str, SyntheticScale] = {
+    'tiny': SyntheticScale(students=25, passages=10, questions_per_passage=4, passages_per_student=10),  # 10³
+    'medium': SyntheticScale(students=2500, passages=400, questions_per_passage=4, passages_per_student=10),  # 10⁵
+    'large': SyntheticScale(students=10000, passages=2000, questions_per_passage=4, passages_per_student=25),  # 10⁶
+}
+
+_SUBJECTS = ['엑스레이 아트', '광합성', '기후 변화', '인공지능', '조선 후기 실학', '미세 플라스틱', '민주주의',
+             '유전자 가위', '도시 재생', '정보 격차', '고전 소설', '음악의 조성', '화폐의 역사', '생태계 교란종',
+             '우주 탐사', '언어의 변화', '공유 경제', '전염병과 면역', '근대 건축', '에너지 전환']
+_NOUNS = ['사회', '기술', '예술', '구조', '원리', '관점', '가치', '문제', '변화', '의미', '영향', '근거', '현상',
+          '과정', '결과', '개념', '사례', '역할', '한계', '특징', '자료', '실험', '전통', '시대', '인간', '환경']
+_MODIFIERS = ['새로운', '중요한', '다양한', '복잡한', '근본적인', '현대적인', '전통적인', '과학적인', '비판적인',
+              '구체적인', '보이지 않는', '사회적인', '역사적인', '창의적인']
+_PREDICATES = ['드러낸다', '설명한다', '보여준다', '강조한다', '바꾸어 놓았다', '이끌어 낸다', '제시한다',
+               '뒷받침한다', '비판한다', '확장한다', '연결한다', '의미한다']
+_CONNECTIVES = ['그러나', '또한', '따라서', '예를 들어', '한편', '이처럼', '결국', '특히']
+_QUESTION_TEMPLATES = {
+    '사실적 독해': ['{s}의 정의는 무엇인가요?', '글에서 설명한 {s}의 {n}을 정리해 보세요.'],
+    '추론적 독해': ['{s}이(가) {n}에 대해 전달하려는 메시지를 추론해 보세요.', '글쓴이가 {s}을(를) 예로 든 이유는 무엇일까요?'],
+    '비판적 독해': ['{s}에 대한 글쓴이의 {n}을 평가해 보세요.', '{s}의 {n}에 대해 반론을 제시해 보세요.'],
+    '창의적 독해': ['{s}의 원리를 응용한 새로운 {n}을 제안해 보세요.', '{s}을(를) 다른 분야에 적용하는 방법을 설명해 보세요.'],
+}
+_FEEDBACK_PRAISE = ['핵심 개념을 정확히 이해하고 있습니다.', '근거를 지문에서 잘 찾아 제시했습니다.',
+                    '자신만의 표현으로 내용을 재구성한 점이 좋습니다.', '논리적 흐름이 자연스럽습니다.']
+_FEEDBACK_LACK = ['구체적인 예시가 부족합니다.', '지문의 근거를 더 명확히 제시할 필요가 있습니다.',
+                  '질문의 요구와 다소 거리가 있는 내용이 포함되어 있습니다.', '배경지식과의 연결이 아쉽습니다.',
+                  '모범답안의 핵심 요소 일부가 빠져 있습니다.']
+
+_SURNAMES = '김이박최정강조윤장임한오서신권황안송류홍'
+_GIVEN = ['지우', '서연', '민준', '하은', '도윤', '서준', '지민', '예린', '현우', '수아', '지호', '유진', '건우', '채원']
+_SCHOOLS = ['보인고등학교', '한빛고등학교', '새솔중학교', '푸른고등학교', '다온중학교', '늘봄고등학교']
+
+
+def _sentence(rnd: random.Random, subject: str) -> str:
+    sentence = (f"{subject}은(는) {rnd.choice(_MODIFIERS)} {rnd.choice(_NOUNS)}의 {rnd.choice(_NOUNS)}을(를) "
+                f"{rnd.choice(_PREDICATES)}.")
+    if rnd.random() < 0.4:
+        sentence = f"{rnd.choice(_CONNECTIVES)}, {sentence}"
+    return sentence
+
+
+def _text(rnd: random.Random, subject: str, min_chars: int, max_chars: int) -> str:
+    target = rnd.randint(min_chars, max_chars)
+    sentences: List[str] = []
+    length = 0
+    while length < target:
+        sentence = _sentence(rnd, subject)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def _answer_pool(rnd: random.Random, subject: str, size: int) -> List[str]:
+    # 답안마다 문장을 새로 만들면 100만 건에서 너무 느리므로 문제별 문장 풀에서 조합한다
+    return [_text(rnd, subject, 40, 120) for _ in range(size)]
+
+
+def _score(rnd: random.Random, ability: float, category: str) -> int:
+    raw = rnd.gauss(ability + CATEGORY_DIFFICULTY.get(category, 0.0), 0.9)
+    return max(0, min(5, round(raw)))
+
+
+def _feedback(rnd: random.Random, score: int) -> str:
+    parts = rnd.sample(_FEEDBACK_PRAISE, k=max(1, min(2, score // 2)))
+    if score < 5:
+        parts += rnd.sample(_FEEDBACK_LACK, k=1 if score >= 3 else 2)
+    return " ".join(parts)
+
+
+def _chunks(rows: Iterator[Tuple], size: int) -> Iterator[List[Tuple]]:
+    chunk: List[Tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate(db_path: str, scale: SyntheticScale, seed: int = 42, ungraded_rate: float = 0.1,
+             start_date: str = "2024-03-01", days: int = 240, batch_size: int = 50000) -> Dict[str, int]:
+    """Fill an empty database with deterministic synthetic data and return row counts"""
+    if scale.passages_per_student > scale.passages:
+        raise ValueError("passages_per_student cannot exceed passages")
+
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    started = time.perf_counter()
+    try:
+        init_schema(conn)
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM students UNION ALL SELECT 1 FROM passages)").fetchone()[0]:
+            raise ValueError(f"{db_path} already contains data; synthetic data needs an empty database")
+
+        # 대량 적재 동안은 동기화/트리거를 끄고, 끝난 뒤 검색 색인과 통계를 한 번에 재구성한다
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -262144")
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+
+        conn.execute("BEGIN")
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+
+        conn.executemany(
+            "INSERT INTO students (id, name, school, student_number) VALUES (?, ?, ?, ?)",
+            ((i, rnd.choice(_SURNAMES) + rnd.choice(_GIVEN), rnd.choice(_SCHOOLS), f"{20240000 + i}")
+             for i in range(1, scale.students + 1))
+        )
+
+        passage_subjects = {}
+        passage_rows = []
+        for passage_id in range(1, scale.passages + 1):
+            subject = _SUBJECTS[(passage_id - 1) % len(_SUBJECTS)]
+            passage_subjects[passage_id] = subject
+            passage_rows.append((passage_id, f"{subject} {passage_id}", _text(rnd, subject, 1200, 3000)))
+        conn.executemany("INSERT INTO passages (id, title, passage) VALUES (?, ?, ?)", passage_rows)
+        del passage_rows
+
+        # 문제: 지문마다 네 가지 독해 유형을 순환
+        questions: Dict[int, List[Tuple[int, str]]] = {}
+        question_rows = []
+        question_id = 0
+        for passage_id, subject in passage_subjects.items():
+            questions[passage_id] = []
+            for index in range(scale.questions_per_passage):
+                question_id += 1
+                category = CATEGORIES[index % len(CATEGORIES)]
+                template = rnd.choice(_QUESTION_TEMPLATES[category])
+                question_rows.append((question_id, passage_id,
+                                      template.format(s=subject, n=rnd.choice(_NOUNS)),
+                                      _text(rnd, subject, 150, 400), category))
+                questions[passage_id].append((question_id, category))
+        conn.executemany(
+            "INSERT INTO questions (id, passage_id, question, model_answer, category) VALUES (?, ?, ?, ?, ?)",
+            question_rows
+        )
+        del question_rows
+
+        answer_pools = {passage_id: _answer_pool(rnd, subject, 32) for passage_id, subject in passage_subjects.items()}
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+
+        def answer_rows() -> Iterator[Tuple]:
+            passage_ids = list(passage_subjects)
+            for student_id in range(1, scale.students + 1):
+                ability = rnd.gauss(3.0, 0.9)
+                for passage_id in sorted(rnd.sample(passage_ids, scale.passages_per_student)):
+                    submitted = start + timedelta(seconds=rnd.randrange(days * 86400))
+                    created_at = submitted.strftime("%Y-%m-%d %H:%M:%S")
+                    pool = answer_pools[passage_id]
+                    for question_id, category in questions[passage_id]:
+                        answer = " ".join(rnd.choices(pool, k=rnd.randint(1, 3)))
+                        if rnd.random() < ungraded_rate:
+                            yield student_id, question_id, answer, None, '', created_at
+                        else:
+                            score = _score(rnd, ability, category)
+                            yield student_id, question_id, answer, score, _feedback(rnd, score), created_at
+
+        for chunk in _chunks(answer_rows(), batch_size):
+            conn.executemany(
+                """INSERT INTO student_answers
+                   (student_id, question_id, student_answer, score, feedback, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                chunk
+            )
+
+        for _, sql in triggers:
+            conn.execute(sql)
+        rebuild_search_indexes(conn)
+        rebuild_rollups(conn)
+        conn.commit()
+        conn.execute("ANALYZE")
+
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('students', 'passages', 'questions', 'student_answers')
+        }
+        conn.execute("PRAGMA synchronous = NORMAL")
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"[Literable] synthetic data (seed={seed}) written to {db_path} in "
+          f"{time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{table}={count:,}" for table, count in counts.items()))
+    return counts
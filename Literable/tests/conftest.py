@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 앱 모듈은 Literable/ 안에서 서로를 최상위 모듈로 import 한다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+import time
+import pytest
+from llm_client import CircuitBreaker, CircuitOpenError, LLMClient
+
+
+class StreamReset(Exception):
+    """HTTP/2 어댑터가 그대로 올려보내는 h2/httpx 예외 (requests 예외가 아님)"""
+
+
+class OkResponse:
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> dict:
+        return {'choices': [{'message': {'content': 'ok'}}], 'usage': {}}
+
+
+class FlakySession:
+    def __init__(self, errors: int):
+        self.errors = errors
+        self.calls = 0
+
+    def post(self, *args, **kwargs) -> OkResponse:
+        self.calls += 1
+        if self.calls <= self.errors:
+            raise StreamReset("stream reset")
+        return OkResponse()
+
+
+def complete(client: LLMClient) -> str:
+    return client.complete([{"role": "user", "content": "hi"}]).content
+
+
+def test_non_requests_error_during_half_open_trial_reopens_breaker():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+    session = FlakySession(errors=2)
+    client = LLMClient(endpoint="http://llm.invalid", api_key="", max_attempts=1, breaker=breaker,
+                       session=session)
+
+    with pytest.raises(StreamReset):
+        complete(client)
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        complete(client)
+
+    time.sleep(0.06)
+    # 반 열림 시험 호출이 requests 예외가 아닌 예외로 끝나도 차단기는 다시 열리기만 한다
+    with pytest.raises(StreamReset):
+        complete(client)
+    assert breaker.state == 'open'
+
+    time.sleep(0.06)
+    assert complete(client) == 'ok'
+    assert breaker.state == 'closed'
+    assert session.calls == 3
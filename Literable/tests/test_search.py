@@ -0,0 +1,79 @@
+from typing import List, Tuple
+import pytest
+from database_manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path) -> DatabaseManager:
+    db = DatabaseManager(str(tmp_path / "search.db"))
+    art = db.add_passage("현대 미술의 흐름", "인상주의 이후 예술가는 빛을 그렸다. 사진의 등장이 회화를 바꾸었다.")
+    db.add_question(art, "글쓴이가 말한 변화는?", "사진이 회화의 역할을 바꾸었다.", '사실적 독해')
+    race = db.add_passage("차별의 역사", "인종에 따른 차별은 제도로 굳어졌다.")
+    db.add_question(race, "제도의 예를 드시오.", "법이 인종을 나누었다.", '추론적 독해')
+    db.add_passage("기후 변화", "해수면이 오르고 있다.")
+    yield db
+    db.pool.close_all()
+
+
+def traced(db: DatabaseManager, search, *args) -> Tuple[list, List[str]]:
+    """Run a search on this thread's connection and return (results, executed SQL)"""
+    statements: List[str] = []
+    with db.connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            return search(*args), statements
+        finally:
+            conn.set_trace_callback(None)
+
+
+def test_two_character_hangul_query_uses_bigram_index(db):
+    assert db.bigram_index
+    results, statements = traced(db, db.search_passages, "예술")
+    assert [row[1] for row in results] == ["현대 미술의 흐름"]
+    sql = "\n".join(statements)
+    assert "passages_bigram MATCH" in sql
+    assert "LIKE" not in sql
+
+    with db.connection() as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT rowid FROM passages_bigram WHERE passages_bigram MATCH ?",
+                            ('"예술"',)).fetchall()
+    assert any("VIRTUAL TABLE INDEX" in row[-1] for row in plan)
+
+
+def test_two_character_terms_match_questions_and_combine(db):
+    assert [row[1] for row in db.fetch_passage_titles("인종")] == ["차별의 역사"]
+    assert [row[1] for row in db.fetch_passage_titles("인종 제도")] == ["차별의 역사"]
+    assert [row[2] for row in db.search_questions("사진")] == ["글쓴이가 말한 변화는?"]
+    assert db.search_passages("예술 인종") == []
+
+
+def test_bigram_index_follows_edits(db):
+    passage_id = db.fetch_passage_titles("기후")[0][0]
+    db.update_passage(passage_id, "기후 변화", "예술도 기후를 다룬다.")
+    assert {row[1] for row in db.search_passages("예술")} == {"현대 미술의 흐름", "기후 변화"}
+    db.delete_passage(passage_id)
+    assert [row[1] for row in db.search_passages("예술")] == ["현대 미술의 흐름"]
+
+
+def test_single_character_term_falls_back_to_like(db):
+    results, statements = traced(db, db.search_passages, "빛")
+    assert [row[1] for row in results] == ["현대 미술의 흐름"]
+    assert "LIKE" in "\n".join(statements)
+
+
+@pytest.mark.parametrize("query", ["미술", "미술의 흐름", "흐름", "미술의", "술"])
+def test_title_search_ignores_bodies_and_questions(db, query):
+    assert [row[1] for row in db.fetch_passage_titles(query, title_only=True)] == ["현대 미술의 흐름"]
+
+
+def test_title_search_does_not_match_body_only_terms(db):
+    # "예술"/"사진" 은 본문과 문제에만 있다
+    assert db.fetch_passage_titles("예술", title_only=True) == []
+    assert db.fetch_passage_titles("사진", title_only=True) == []
+    assert [row[1] for row in db.fetch_passage_titles("예술")] == ["현대 미술의 흐름"]
+
+
+def test_title_search_uses_index(db):
+    results, statements = traced(db, db.fetch_passage_titles, "차별", True)
+    assert [row[1] for row in results] == ["차별의 역사"]
+    assert "passages_bigram MATCH" in "\n".join(statements)
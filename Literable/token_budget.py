@@ -0,0 +1,85 @@
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import config
+from rate_limit import estimate_tokens
+
+# 네트워크 없이 쓰는 토큰 예산 도구.
+# 요청별 입력 토큰 추정(rate_limit.estimate_tokens 와 같은 보수적 추정), 문항 유형별 출력 상한,
+# 입력 상한을 넘는 텍스트의 결정적 잘라내기, 여러 학생 채점 전 토큰/비용/소요 시간 예상치를 제공한다.
+
+# 문항 유형별 출력 토큰 상한 (JSON {"score", "feedback"} 응답 기준)
+# 답이 정해진 사실적 독해는 첨삭이 짧고, 비판적/창의적 독해는 근거를 짚는 첨삭이 길다
+OUTPUT_TOKEN_CAPS: Dict[str, int] = {
+    '사실적 독해': 500,
+    '추론적 독해': 800,
+    '비판적 독해': 1000,
+    '창의적 독해': 1000,
+    '': 800,
+}
+# 지문 전체를 한 번에 채점할 때 응답 하나의 출력 상한
+PASSAGE_MAX_OUTPUT_TOKENS = 4000
+
+# 메시지마다 붙는 역할/구분 토큰 (rate_limit.estimate_request_tokens 와 같은 값)
+MESSAGE_OVERHEAD = 4
+TRUNCATION_MARK = " …(이하 생략)"
+
+
+def output_cap(category: Optional[str]) -> int:
+    """문항 유형의 출력 토큰 상한 (모르는 유형은 기본값)"""
+    return OUTPUT_TOKEN_CAPS.get(category or '', OUTPUT_TOKEN_CAPS[''])
+
+
+def prompt_tokens(*contents: str) -> int:
+    """메시지 내용들의 입력 토큰 추정치"""
+    return sum(estimate_tokens(content or "") + MESSAGE_OVERHEAD for content in contents)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """추정 토큰이 max_tokens 이하가 되도록 앞부분만 남김 (같은 입력이면 항상 같은 결과)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARK)
+    if budget <= 0:
+        return ""
+    # 추정 토큰 수는 길이에 대해 단조 증가하므로 이분 탐색으로 가장 긴 앞부분을 찾는다
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + TRUNCATION_MARK
+
+
+class RunEstimate(NamedTuple):
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    cost: float
+    seconds: float
+
+
+def estimate_run(requests: List[Tuple[int, int]], concurrency: int,
+                 requests_per_minute: int = config.LLM_RPM,
+                 tokens_per_minute: int = config.LLM_TPM) -> RunEstimate:
+    """(입력 토큰, 출력 상한) 요청 목록의 총 토큰/비용(USD)/소요 시간(초) 예상치.
+
+    출력은 상한의 LLM_EXPECTED_OUTPUT_RATIO 만큼 나온다고 보고, 소요 시간은 동시 실행 수와
+    RPM/TPM 한도(한도 계산은 입력 + 출력 상한) 중 더 느린 쪽으로 잡는다. 캐시/유사 답안 재사용과
+    프롬프트 캐시 할인은 반영하지 않으므로 상한에 가까운 값이다.
+    """
+    count = len(requests)
+    if not count:
+        return RunEstimate(0, 0, 0, 0.0, 0.0)
+    input_tokens = sum(tokens for tokens, _ in requests)
+    output_tokens = sum(math.ceil(cap * config.LLM_EXPECTED_OUTPUT_RATIO) for _, cap in requests)
+    cost = (input_tokens * config.LLM_PRICE_INPUT_PER_1M + output_tokens * config.LLM_PRICE_OUTPUT_PER_1M) / 1e6
+
+    latency = config.LLM_BASE_LATENCY + output_tokens / count / config.LLM_OUTPUT_TOKENS_PER_SECOND
+    seconds = math.ceil(count / max(1, concurrency)) * latency
+    if requests_per_minute > 0:
+        seconds = max(seconds, count / requests_per_minute * 60)
+    if tokens_per_minute > 0:
+        seconds = max(seconds, (input_tokens + sum(cap for _, cap in requests)) / tokens_per_minute * 60)
+    return RunEstimate(count, input_tokens, output_tokens, cost, seconds)